@@ -0,0 +1,167 @@
+"""Multi-camera scheduling with one shared object detector"""
+
+import logging
+import os
+import time
+import sys
+from typing import List, Optional, Tuple
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.config import Config
+from cat_detector.object_detector import ObjectDetector
+from cat_detector.mqtt_handler import MQTTHandler
+from cat_detector.database_handler import DatabaseHandler
+from cat_detector.results_cleanup import RetentionManager
+from cat_detector.metrics import STAGE_SECONDS
+from cat_detector.stream_processor import StreamProcessor
+from cat_detector.startup import STARTUP
+
+
+logger = logging.getLogger(__name__)
+
+
+class CameraScheduler:
+    """Runs several camera streams in one process on a single YOLO model
+
+    Every camera keeps its own StreamProcessor (frame grabber, ignore zone,
+    database rows and MQTT topic), but all of them share one ObjectDetector,
+    one MQTT connection and one database connection pool.
+    Cameras with a fresh frame are picked by smooth weighted round-robin, so a
+    camera with priority 2 gets twice the inference slots of a camera with
+    priority 1 while no camera is ever starved. With inference_batch_size > 1
+    the newest frames of several cameras go through one batched forward pass.
+    """
+
+    def __init__(self, config: Config, output_dir: str,
+                 detector: Optional[ObjectDetector] = None):
+        self.config = config
+        camera_configs = config.get_camera_configs()
+        # Connect to all streams while the model loads
+        grabbers = [StreamProcessor.create_frame_grabber(camera_config)
+                    for camera_config in camera_configs]
+        for grabber in grabbers:
+            grabber.start()
+
+        tasks = {'mqtt': lambda: MQTTHandler(config),
+                 'database': lambda: DatabaseHandler(config).warm_up()}
+        if detector is None:
+            tasks['model'] = lambda: ObjectDetector.from_config(config).warm_up()
+        started = STARTUP.run_parallel(tasks)
+        self.detector = detector or started['model']
+        self.mqtt_handler = started['mqtt']
+        self.db_handler = started['database']
+        self.retention = RetentionManager(output_dir, config.usage_threshold,
+                                          config.retention_interval)
+        self.processors: List[StreamProcessor] = []
+
+        for camera_config, grabber in zip(camera_configs, grabbers):
+            camera_output_dir = os.path.join(output_dir, camera_config.camera_name)
+            self.processors.append(
+                StreamProcessor(camera_config, camera_output_dir, self.detector,
+                                self.mqtt_handler, self.db_handler, self.retention,
+                                grabber))
+
+        self._current_weights = [0] * len(self.processors)
+        self.idle_sleep = 0.01  # Seconds to wait when no camera has a new frame
+        # Set by the application to run profiling windows from this loop
+        self.profiler = None
+
+    def _select_processor(self, exclude: Optional[set] = None) -> Optional[StreamProcessor]:
+        """Selects the next camera with a pending frame (smooth weighted round-robin)"""
+        exclude = exclude or set()
+        ready = [index for index, processor in enumerate(self.processors)
+                 if id(processor) not in exclude and processor.frame_due()
+                 and processor.frame_grabber.has_frame()]
+        if not ready:
+            return None
+
+        total_weight = 0
+        selected = ready[0]
+        for index in ready:
+            weight = max(1, self.processors[index].config.camera_priority)
+            self._current_weights[index] += weight
+            total_weight += weight
+            if self._current_weights[index] > self._current_weights[selected]:
+                selected = index
+
+        self._current_weights[selected] -= total_weight
+        return self.processors[selected]
+
+    def _collect_batch(self) -> List[Tuple[StreamProcessor, object]]:
+        """Collects frames from different cameras for one batched forward pass
+
+        Waits at most inference_batch_wait_ms after the first frame for the
+        batch to fill up. Each camera contributes at most one frame, which is
+        always its newest one.
+        """
+        batch = []
+        batch_size = min(self.config.inference_batch_size, len(self.processors))
+        deadline = None
+
+        while len(batch) < batch_size:
+            processor = self._select_processor(
+                exclude={id(entry[0]) for entry in batch})
+            if processor is not None:
+                frame = processor.frame_grabber.read(timeout=0)
+                if frame is not None:
+                    batch.append((processor, frame))
+                    if deadline is None:
+                        deadline = (time.monotonic()
+                                    + self.config.inference_batch_wait_ms / 1000)
+                continue
+
+            if deadline is None or time.monotonic() >= deadline:
+                break
+            time.sleep(self.idle_sleep)
+
+        return batch
+
+    def _process_batch(self, batch: List[Tuple[StreamProcessor, object]]):
+        """Runs one batched inference and routes the results back to each camera"""
+        # ROI cameras batch their own crops
+        for processor, frame in batch:
+            if processor.roi_cropper:
+                processor.process_frame(frame)
+        batch = [(processor, frame) for processor, frame in batch
+                 if not processor.roi_cropper]
+
+        prepared = [(processor, processor.prepare_frame(frame)) for processor, frame in batch]
+        prepared = [(processor, frame) for processor, frame in prepared
+                    if processor.needs_inference(frame)]
+        if not prepared:
+            return
+
+        # One forward pass for all cameras
+        with STAGE_SECONDS.time(camera='all', stage='inference'):
+            outputs = self.detector.detect_batch([frame for _, frame in prepared])
+        for (processor, frame), (detections, _) in zip(prepared, outputs):
+            processor.handle_detections(frame, detections)
+
+    def run(self):
+        """Main loop for multi-camera processing"""
+        self.retention.start()
+        for processor in self.processors:
+            logger.info("Starting camera %s (priority %s)", processor.config.camera_name,
+                        processor.config.camera_priority)
+            processor.frame_grabber.start()
+
+        try:
+            while True:
+                batch = self._collect_batch()
+                if not batch:
+                    time.sleep(self.idle_sleep)
+                elif len(batch) == 1:
+                    processor, frame = batch[0]
+                    processor.process_frame(frame)
+                else:
+                    self._process_batch(batch)
+
+                for camera_processor in self.processors:
+                    camera_processor.print_capture_stats_if_needed()
+                if self.profiler:
+                    self.profiler.tick()
+        finally:
+            for processor in self.processors:
+                processor.stop()
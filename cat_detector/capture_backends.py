@@ -0,0 +1,214 @@
+"""Stream capture backends: OpenCV, FFmpeg pipe and GStreamer with decode-time scaling"""
+
+import logging
+import shutil
+import subprocess
+from typing import Optional
+import cv2
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.hardware_detector import HardwareDetector
+
+
+logger = logging.getLogger(__name__)
+
+
+CAPTURE_BACKENDS = ('opencv', 'ffmpeg', 'gstreamer')
+
+# GStreamer decoder elements per codec and hardware (Jetson: NVDEC, Pi: V4L2)
+GSTREAMER_DECODERS = {
+    'h264': {'jetson': 'nvv4l2decoder', 'raspberry_pi': 'v4l2h264dec',
+             'vaapi': 'vaapih264dec', 'none': 'avdec_h264'},
+    'h265': {'jetson': 'nvv4l2decoder', 'raspberry_pi': 'v4l2h265dec',
+             'vaapi': 'vaapih265dec', 'none': 'avdec_h265'},
+}
+
+
+class FFmpegPipeCapture:
+    """cv2.VideoCapture-like reader for raw BGR frames from an ffmpeg subprocess
+
+    ffmpeg decodes (with hardware acceleration where available), scales to
+    width x height and converts to BGR itself, so Python only ever receives
+    frames of the target size.
+    """
+
+    def __init__(self, command: list, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 3
+        self._process = None
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL,
+                                             bufsize=self.frame_size)
+        except OSError as e:
+            logger.error("Error starting ffmpeg: %s", e)
+
+    def isOpened(self) -> bool:  # pylint: disable=invalid-name
+        """Returns True while ffmpeg is running"""
+        return self._process is not None and self._process.poll() is None
+
+    def read(self):
+        """Reads one frame, returns (ret, frame) like cv2.VideoCapture.read"""
+        if self._process is None:
+            return False, None
+        # A fresh buffer per frame: frames are handed on to other threads
+        buffer = bytearray(self.frame_size)
+        view = memoryview(buffer)
+        received = 0
+        while received < self.frame_size:
+            count = self._process.stdout.readinto(view[received:])
+            if not count:
+                return False, None
+            received += count
+        frame = np.frombuffer(buffer, dtype=np.uint8)
+        return True, frame.reshape((self.height, self.width, 3))
+
+    def set(self, prop_id, value):  # pylint: disable=unused-argument
+        """Capture properties are part of the ffmpeg command line"""
+        return False
+
+    def release(self):
+        """Stops ffmpeg"""
+        if self._process is None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._process.stdout.close()
+        self._process = None
+
+
+class CaptureBackend:  # pylint: disable=too-many-instance-attributes
+    """Opens video streams with the configured decoder pipeline
+
+    'opencv' is the plain cv2.VideoCapture (optionally with OpenCV's own
+    hardware acceleration). 'ffmpeg' and 'gstreamer' decode, scale to
+    width x height and convert to BGR inside the pipeline, optionally on the
+    hardware decoder and limited to fps frames per second, so a 4K stream
+    never reaches Python at full size. 'ffmpeg' can also skip decoding of
+    everything but keyframes (a few frames per second at most, usually
+    enough for a garden camera).
+    """
+
+    def __init__(self, backend: str = 'opencv', width: int = 1920,  # pylint: disable=too-many-arguments
+                 height: int = 1080, hwaccel: str = 'none', decoder: Optional[str] = None,
+                 codec: str = 'h264', fps: float = 0, keyframes_only: bool = False,
+                 hardware_type: Optional[str] = None):
+        backend = backend.lower()
+        if backend not in CAPTURE_BACKENDS:
+            logger.warning("Unknown capture backend %s, using opencv", backend)
+            backend = 'opencv'
+        if backend == 'ffmpeg' and shutil.which('ffmpeg') is None:
+            logger.warning("ffmpeg not found, using opencv capture")
+            backend = 'opencv'
+        if keyframes_only and backend != 'ffmpeg':
+            logger.warning("Keyframe-only decoding needs capture_backend=ffmpeg, "
+                           "decoding all frames")
+
+        self.backend = backend
+        self.width = width
+        self.height = height
+        self.hwaccel = hwaccel.lower()
+        self.decoder = decoder
+        self.codec = codec.lower()
+        self.fps = fps
+        self.keyframes_only = keyframes_only
+        self.hardware_type = hardware_type
+
+    @classmethod
+    def from_config(cls, config) -> 'CaptureBackend':
+        """Creates a capture backend from the application configuration"""
+        return cls(backend=config.capture_backend,
+                   width=config.capture_width,
+                   height=config.capture_height,
+                   hwaccel=config.capture_hwaccel,
+                   decoder=config.capture_decoder,
+                   codec=config.capture_codec,
+                   fps=config.capture_fps,
+                   keyframes_only=config.capture_keyframes_only,
+                   hardware_type=config.hardware_type)
+
+    def ffmpeg_command(self, url: str) -> list:
+        """Builds the ffmpeg command line that writes raw BGR frames to stdout"""
+        command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if url.startswith('rtsp://'):
+            command += ['-rtsp_transport', 'tcp']
+        if self.hwaccel != 'none':
+            command += ['-hwaccel', self.hwaccel]
+        if self.keyframes_only:
+            # Decoder option: non-keyframes are not even decoded
+            command += ['-skip_frame', 'nokey']
+        if self.decoder:
+            command += ['-c:v', self.decoder]
+        command += ['-i', url, '-an']
+
+        filters = [f'scale={self.width}:{self.height}']
+        if self.fps > 0 and not self.keyframes_only:
+            filters.insert(0, f'fps={self.fps}')
+        # Pass frames through as decoded, never duplicate them
+        command += ['-vf', ','.join(filters), '-vsync', '0',
+                    '-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+        return command
+
+    def _gstreamer_decoder(self) -> str:
+        """Returns the GStreamer decoder element for the codec and hardware"""
+        if self.decoder:
+            return self.decoder
+        decoders = GSTREAMER_DECODERS.get(self.codec, GSTREAMER_DECODERS['h264'])
+        hwaccel = self.hwaccel
+        if hwaccel == 'auto':
+            hwaccel = (self.hardware_type or '').lower()
+            if not hwaccel:
+                detector = HardwareDetector()
+                hwaccel = ('jetson' if detector.is_jetson else
+                           'raspberry_pi' if detector.is_raspberry_pi else 'none')
+        return decoders.get(hwaccel, decoders['none'])
+
+    def gstreamer_pipeline(self, url: str) -> str:
+        """Builds the GStreamer pipeline that ends in a BGR appsink"""
+        decoder = self._gstreamer_decoder()
+        if url.startswith('rtsp://'):
+            source = (f'rtspsrc location="{url}" latency=0 protocols=tcp ! '
+                      f'rtp{self.codec}depay ! {self.codec}parse')
+        else:
+            source = f'filesrc location="{url}" ! parsebin'
+
+        # Jetson decodes and scales in NVMM memory, others scale in software
+        if decoder == 'nvv4l2decoder':
+            convert = (f'nvvidconv ! video/x-raw,format=BGRx,'
+                       f'width={self.width},height={self.height} ! videoconvert')
+        else:
+            convert = (f'videoscale ! video/x-raw,width={self.width},'
+                       f'height={self.height} ! videoconvert')
+
+        rate = ''
+        if self.fps > 0:
+            rate = f'videorate drop-only=true max-rate={int(self.fps)} ! '
+        return (f'{source} ! {decoder} ! {rate}{convert} ! '
+                f'video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false')
+
+    def open(self, url: str):
+        """Opens a stream, returns an object with the cv2.VideoCapture interface"""
+        if self.backend == 'ffmpeg':
+            return FFmpegPipeCapture(self.ffmpeg_command(url), self.width, self.height)
+
+        if self.backend == 'gstreamer':
+            return cv2.VideoCapture(self.gstreamer_pipeline(url), cv2.CAP_GSTREAMER)
+
+        if self.hwaccel != 'none' and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+            cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG,
+                                   [cv2.CAP_PROP_HW_ACCELERATION,
+                                    cv2.VIDEO_ACCELERATION_ANY])
+        else:
+            cap = cv2.VideoCapture(url)
+        # Not every backend honours this, the grabber's single slot covers the rest
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
@@ -1,5 +1,22 @@
 """Configuration management for the cat deterrent system"""
 
+import copy
+import os
+
+
+DOCKER_CONFIG_PATH = '/app/config.txt'
+
+# config.txt in the repository root, independent of the working directory
+LOCAL_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'config.txt')
+
+
+def default_config_path() -> str:
+    """Returns the config.txt path of the Docker container, else of the repository root"""
+    if os.path.exists(DOCKER_CONFIG_PATH):
+        return DOCKER_CONFIG_PATH
+    return LOCAL_CONFIG_PATH
+
 
 class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
     """Configuration class for the cat deterrent system"""
@@ -17,18 +34,51 @@ class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attrib
                 if '=' in line:
                     key, value = line.split('=', 1)
                     config[key.strip()] = value.strip()
+        self._values = config
 
         # RTSP and MQTT configuration
         self.rtsp_stream_url = config.get('rtsp_stream_url')
+        # Lower-resolution substream used for detection instead of the main stream
+        self.rtsp_substream_url = config.get('rtsp_substream_url')
+
+        # Capture backend: opencv, ffmpeg or gstreamer; the latter two decode
+        # (optionally on the hardware decoder) and scale to capture_width x
+        # capture_height inside the pipeline. capture_fps limits the decoded
+        # rate (0 = all frames), capture_keyframes_only decodes keyframes only
+        self.capture_backend = config.get('capture_backend', 'opencv')
+        self.capture_hwaccel = config.get('capture_hwaccel', 'none')
+        self.capture_decoder = config.get('capture_decoder')
+        self.capture_codec = config.get('capture_codec', 'h264')
+        self.capture_width = int(config.get('capture_width', 1920))
+        self.capture_height = int(config.get('capture_height', 1080))
+        self.capture_fps = float(config.get('capture_fps', 0))
+        self.capture_keyframes_only = config.get('capture_keyframes_only',
+                                                 'false').lower() == 'true'
         self.mqtt_broker_url = config.get('mqtt_broker_url')
         self.mqtt_broker_port = int(config.get('mqtt_broker_port', 1883))
         self.mqtt_topic = config.get('mqtt_topic')
         self.mqtt_username = config.get('mqtt_username')
         self.mqtt_password = config.get('mqtt_password')
+        self.mqtt_qos = int(config.get('mqtt_qos', 1))
+        self.mqtt_offline_queue_size = int(config.get('mqtt_offline_queue_size', 100))
+        self.mqtt_reconnect_min_delay = int(config.get('mqtt_reconnect_min_delay', 1))
+        self.mqtt_reconnect_max_delay = int(config.get('mqtt_reconnect_max_delay', 60))
 
         # Detection configuration
         self.confidence_threshold = float(config.get('confidence_threshold', 0.5))
+        # Classes YOLO looks for (COCO names or IDs) and per-class thresholds
+        # "cat:0.4,person:0.7"; confidence_threshold applies to unlisted classes
+        self.target_classes = [name.strip() for name in
+                               config.get('target_classes', 'cat').split(',') if name.strip()]
+        self.class_confidence = self._parse_class_confidence(config.get('class_confidence'))
         self.usage_threshold = float(config.get('usage_threshold', 0.8))
+        self.retention_interval = float(config.get('retention_interval', 60))
+
+        # Batched inference: up to inference_batch_size frames (from several
+        # cameras or consecutive frames) share one forward pass, waiting at
+        # most inference_batch_wait_ms for the batch to fill up
+        self.inference_batch_size = int(config.get('inference_batch_size', 1))
+        self.inference_batch_wait_ms = float(config.get('inference_batch_wait_ms', 20))
 
         # Database configuration
         self.db_host = config.get('db_host', 'localhost')
@@ -36,21 +86,244 @@ class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attrib
         self.db_password = config.get('db_password', 'p7eWPjGeIRXtMvCJw--')
         self.db_database = config.get('db_database', 'katzenschreck')
         self.camera_name = config.get('camera_name', 'cam_garten')
+        # JPEG encoding (frames are encoded once for disk and database):
+        # encoder backend auto, opencv, turbojpeg or pil
+        self.jpeg_quality = int(config.get('jpeg_quality', 95))
+        self.thumbnail_width = int(config.get('thumbnail_width', 300))
+        self.thumbnail_quality = int(config.get('thumbnail_quality', 85))
+        self.jpeg_encoder = config.get('jpeg_encoder', 'auto')
+
+        # Content-addressed image store: full-size JPEGs on disk instead of LONGBLOBs
+        self.image_store_dir = config.get('image_store_dir')
+        # Pool size default: see _default_db_pool_size; a full pool makes
+        # callers wait up to db_pool_timeout seconds for a free connection
+        self.db_pool_size = int(config.get('db_pool_size', 0))
+        self.db_pool_timeout = float(config.get('db_pool_timeout', 10))
+        self.db_batch_size = int(config.get('db_batch_size', 1))
+        self.db_batch_interval = float(config.get('db_batch_interval', 2.0))
+
+        # Database retention: all detections are kept for retention_keep_all_days,
+        # then the best one per hour until retention_hourly_days, then the best
+        # one per day; snapshots go after retention_snapshot_days (0 = keep)
+        self.db_retention_enabled = config.get('db_retention_enabled',
+                                               'false').lower() == 'true'
+        self.db_retention_interval = float(config.get('db_retention_interval', 3600))
+        self.db_retention_batch_size = int(config.get('db_retention_batch_size', 500))
+        self.retention_keep_all_days = float(config.get('retention_keep_all_days', 7))
+        self.retention_hourly_days = float(config.get('retention_hourly_days', 30))
+        self.retention_max_days = float(config.get('retention_max_days', 0))
+        self.retention_snapshot_days = float(config.get('retention_snapshot_days', 30))
+
+        # Visit tracking: group detections into visit events (MQTT at start and
+        # end, only the best frame stored, or the best one every
+        # event_store_interval seconds while the visit lasts)
+        self.event_tracking_enabled = config.get('event_tracking_enabled',
+                                                 'false').lower() == 'true'
+        self.event_iou_threshold = float(config.get('event_iou_threshold', 0.3))
+        self.event_end_timeout = float(config.get('event_end_timeout', 10))
+        self.event_store_interval = float(config.get('event_store_interval', 0))
+
+        # Persistence pipeline: detections are annotated, encoded and stored by
+        # background workers; drop policy when the queue is full:
+        # drop_oldest, drop_newest or block
+        self.persistence_workers = int(config.get('persistence_workers', 1))
+        self.persistence_queue_size = int(config.get('persistence_queue_size', 16))
+        self.persistence_drop_policy = config.get('persistence_drop_policy', 'drop_oldest')
 
         # Ignore zone configuration
-        ignore_zone_str = config.get('ignore_zone')
-        if ignore_zone_str:
-            self.ignore_zone = [float(x) for x in ignore_zone_str.split(',')]
+        self.ignore_zone = self._parse_zone(config.get('ignore_zone'))
+        # Polygon zones "x,y x,y x,y;x,y ..." (fractions, ';' between polygons):
+        # boxes with more than zone_overlap_threshold of their area in an
+        # ignore zone or outside all include zones are dropped
+        self.ignore_zones = self._parse_polygons(config.get('ignore_zones'))
+        self.include_zones = self._parse_polygons(config.get('include_zones'))
+        self.zone_overlap_threshold = float(config.get('zone_overlap_threshold', 0.0))
+
+        # Motion gate: only run YOLO when motion is found outside the ignore
+        # zone, forcing an inference every motion_force_interval seconds
+        self.motion_gate_enabled = config.get('motion_gate_enabled',
+                                              'false').lower() == 'true'
+        self.motion_threshold = int(config.get('motion_threshold', 25))
+        self.motion_min_area = float(config.get('motion_min_area', 0.002))
+        self.motion_force_interval = float(config.get('motion_force_interval', 10))
+
+        # ROI cropping: run YOLO on full-resolution crops around motion regions
+        # and the configured roi_zones (x_min,y_min,x_max,y_max;...)
+        self.roi_crop_enabled = config.get('roi_crop_enabled',
+                                           'false').lower() == 'true'
+        roi_zones_str = config.get('roi_zones')
+        self.roi_zones = ([self._parse_zone(zone) for zone in roi_zones_str.split(';')
+                           if zone.strip()] if roi_zones_str else [])
+        self.roi_padding = float(config.get('roi_padding', 0.05))
+        self.roi_min_size = int(config.get('roi_min_size', 640))
+
+        # Multi-camera configuration (optional): comma separated camera names,
+        # each camera reads its settings from "<camera>.<key>" entries
+        cameras_str = config.get('cameras')
+        if cameras_str:
+            self.cameras = [name.strip() for name in cameras_str.split(',')
+                            if name.strip()]
         else:
-            self.ignore_zone = None
+            self.cameras = []
+        self.camera_priority = int(config.get('camera_priority', 1))
+        if self.db_pool_size <= 0:
+            self.db_pool_size = self._default_db_pool_size()
+
+        # Model and inference backend (auto, pytorch, onnx, openvino, torchscript).
+        # Exported models are cached in model_cache_dir; precision fp16/int8 is
+        # used where the backend supports it
+        self.model_path = config.get('model_path')
+        self.inference_backend = config.get('inference_backend', 'auto')
+        self.inference_imgsz = int(config.get('inference_imgsz', 640))
+        self.inference_precision = config.get('inference_precision', 'fp32')
+        self.model_cache_dir = config.get('model_cache_dir')
+
+        # Startup calibration: time candidate models/input sizes once and use
+        # the largest one that reaches calibration_target_fps
+        self.model_calibration_enabled = config.get('model_calibration_enabled',
+                                                    'false').lower() == 'true'
+        self.calibration_target_fps = float(config.get('calibration_target_fps', 1.0))
+        max_latency = config.get('calibration_max_latency_ms')
+        self.calibration_max_latency_ms = float(max_latency) if max_latency else None
+        self.calibration_models = [model.strip() for model in config.get(
+            'calibration_models',
+            'yolo11x.pt,yolo11l.pt,yolo11m.pt,yolo11s.pt,yolo11n.pt').split(',')]
+        self.calibration_imgsz = [int(size) for size in config.get(
+            'calibration_imgsz', '640,480,320').split(',')]
+        self.calibration_sample_dir = config.get('calibration_sample_dir')
 
         # Hardware type override (optional: jetson, raspberry_pi, generic)
         self.hardware_type = config.get('hardware_type')
 
+        # Adaptive processing rate: idle_fps when nothing happened for
+        # active_hold_seconds, active_fps after motion or a detection; the
+        # interval doubles while the SoC is above thermal_limit_celsius or the
+        # load per core above cpu_load_limit
+        self.adaptive_rate_enabled = config.get('adaptive_rate_enabled',
+                                                'false').lower() == 'true'
+        self.idle_fps = float(config.get('idle_fps', 1.0))
+        self.active_fps = float(config.get('active_fps', 5.0))
+        self.active_hold_seconds = float(config.get('active_hold_seconds', 30))
+        self.thermal_limit_celsius = float(config.get('thermal_limit_celsius', 75))
+        self.cpu_load_limit = float(config.get('cpu_load_limit', 0.9))
+        self.thermal_check_interval = float(config.get('thermal_check_interval', 5))
+
+        # Prometheus-style metrics endpoint (http://<host>:<port>/metrics)
+        self.metrics_enabled = config.get('metrics_enabled', 'false').lower() == 'true'
+        self.metrics_host = config.get('metrics_host', '0.0.0.0')
+        self.metrics_port = int(config.get('metrics_port', 9100))
+
+        # Logging: level, text or json output; at most log_rate_limit INFO/DEBUG
+        # messages per source line, camera and log_rate_interval seconds
+        # (0 = unlimited; warnings and errors are never limited), and
+        # per-frame events are summarised every log_aggregate_interval seconds
+        self.log_level = config.get('log_level', 'INFO').upper()
+        self.log_format = config.get('log_format', 'text').lower()
+        self.log_rate_limit = int(config.get('log_rate_limit', 5))
+        self.log_rate_interval = float(config.get('log_rate_interval', 60))
+        self.log_aggregate_interval = float(config.get('log_aggregate_interval', 60))
+
+        # Profiling: a profiling_window seconds report (stage timings, optional
+        # cProfile/tracemalloc) every profiling_interval seconds if enabled, and
+        # whenever the process receives SIGUSR1
+        self.profiling_enabled = config.get('profiling_enabled', 'false').lower() == 'true'
+        self.profiling_interval = float(config.get('profiling_interval', 3600))
+        self.profiling_window = float(config.get('profiling_window', 30))
+        self.profiling_cpu = config.get('profiling_cpu', 'true').lower() == 'true'
+        self.profiling_memory = config.get('profiling_memory', 'false').lower() == 'true'
+        self.profiling_dir = config.get('profiling_dir')
+
+    def _default_db_pool_size(self) -> int:
+        """Returns a pool size that covers every thread that may hold a connection"""
+        # Persistence workers of every camera, the batch flush thread, the
+        # retention job and one spare; mysql.connector allows at most 32
+        size = max(1, len(self.cameras)) * max(1, self.persistence_workers) + 1
+        if self.db_batch_size > 1:
+            size += 1
+        if self.db_retention_enabled:
+            size += 1
+        return min(size, 32)
+
+    @staticmethod
+    def _parse_zone(zone_str):
+        """Parses a zone given as x_min,y_min,x_max,y_max"""
+        if not zone_str:
+            return None
+        return [float(x) for x in zone_str.split(',')]
+
+    @staticmethod
+    def _parse_class_confidence(value):
+        """Parses per-class thresholds given as name:threshold,name:threshold"""
+        if not value:
+            return {}
+        thresholds = {}
+        for entry in value.split(','):
+            name, threshold = entry.split(':', 1)
+            thresholds[name.strip().lower()] = float(threshold)
+        return thresholds
+
+    def min_confidence(self) -> float:
+        """Returns the lowest threshold of all target classes (over all cameras)"""
+        maps = [self.class_confidence] + [
+            self._parse_class_confidence(self._values.get(f'{camera}.class_confidence'))
+            for camera in self.cameras]
+        return min(thresholds.get(name.lower(), self.confidence_threshold)
+                   for thresholds in maps for name in self.target_classes or ['cat'])
+
+    @staticmethod
+    def _parse_polygons(polygons_str):
+        """Parses polygons given as x,y x,y x,y;x,y x,y x,y"""
+        if not polygons_str:
+            return []
+        polygons = []
+        for polygon_str in polygons_str.split(';'):
+            points = [tuple(float(value) for value in point.split(','))
+                      for point in polygon_str.split()]
+            if len(points) < 3:
+                raise ValueError(f"Zone polygon needs at least 3 points: {polygon_str}")
+            polygons.append(points)
+        return polygons
+
+    def for_camera(self, camera: str) -> 'Config':
+        """Returns a copy of this configuration with the camera's overrides applied"""
+        camera_config = copy.copy(self)
+        camera_config.cameras = []
+        camera_config.camera_name = camera
+
+        prefix = f'{camera}.'
+        overrides = {key[len(prefix):]: value for key, value in self._values.items()
+                     if key.startswith(prefix)}
+
+        camera_config.rtsp_stream_url = overrides.get('rtsp_stream_url')
+        camera_config.rtsp_substream_url = overrides.get('rtsp_substream_url')
+        camera_config.mqtt_topic = overrides.get('mqtt_topic', self.mqtt_topic)
+        if 'ignore_zone' in overrides:
+            camera_config.ignore_zone = self._parse_zone(overrides['ignore_zone'])
+        if 'class_confidence' in overrides:
+            camera_config.class_confidence = self._parse_class_confidence(
+                overrides['class_confidence'])
+        if 'ignore_zones' in overrides:
+            camera_config.ignore_zones = self._parse_polygons(overrides['ignore_zones'])
+        if 'include_zones' in overrides:
+            camera_config.include_zones = self._parse_polygons(overrides['include_zones'])
+        camera_config.camera_priority = int(overrides.get('priority',
+                                                          self.camera_priority))
+        return camera_config
+
+    def get_camera_configs(self) -> list:
+        """Returns one configuration per camera (just this one in single-camera mode)"""
+        if not self.cameras:
+            return [self]
+        return [self.for_camera(camera) for camera in self.cameras]
+
     def _validate_config(self):
         """Validates the configuration"""
+        for camera in self.cameras:
+            if not self._values.get(f'{camera}.rtsp_stream_url'):
+                raise ValueError(f"{camera}.rtsp_stream_url not found in config.txt")
+
         required_fields = [
-            ('rtsp_stream_url', self.rtsp_stream_url),
+            ('rtsp_stream_url', self.rtsp_stream_url or self.cameras),
             ('mqtt_broker_url', self.mqtt_broker_url),
             ('mqtt_topic', self.mqtt_topic),
             ('mqtt_username', self.mqtt_username),
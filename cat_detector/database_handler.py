@@ -1,8 +1,12 @@
 """Database handler for MariaDB operations"""
 
+import logging
+import threading
+import time
+from typing import Optional
 import cv2
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
 import sys
 import os
 
@@ -10,95 +14,241 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cat_detector.config import Config
+from cat_detector.image_store import ImageStore
+from cat_detector.image_encoder import EncodedImage, ImageEncoder
+from cat_detector.metrics import REGISTRY, DB_INSERT_FAILURES, DB_INSERT_SECONDS
 
 
-class DatabaseHandler:  # pylint: disable=too-few-public-methods
-    """Database handler for MariaDB connection"""
+logger = logging.getLogger(__name__)
+
+
+INSERT_SQL = """
+INSERT INTO detections_images (camera_name, accuracy, blob_jpeg, thumbnail_jpeg)
+VALUES (%s, %s, %s, %s)
+"""
+
+# Image store variant: the full-size JPEG lives on disk, the row keeps its path
+INSERT_STORE_SQL = """
+INSERT INTO detections_images
+    (camera_name, accuracy, image_path, image_size, image_sha256, thumbnail_jpeg)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+class DatabaseHandler:  # pylint: disable=too-many-instance-attributes
+    """Database handler for MariaDB with a connection pool and batched inserts
+
+    Connections come from a small pool and are health-checked (ping with
+    reconnect) before use. With db_batch_size > 1, rows are buffered and
+    written with one multi-row INSERT per transaction once the batch is full
+    or db_batch_interval seconds have passed; a batch that fails is kept for
+    the next flush (at most MAX_PENDING_BATCHES batches, the oldest rows are
+    dropped first). With image_store_dir set, the
+    full-size JPEG goes to a content-addressed ImageStore and only its path,
+    size and hash are written; thumbnails always stay inline.
+    """
+
+    # Failed batches kept for retrying while the database is unreachable
+    MAX_PENDING_BATCHES = 4
 
     def __init__(self, config: Config):
         self.config = config
-
-    def _get_connection(self):
-        """Creates a new database connection"""
+        self.image_store = None
+        if config.image_store_dir:
+            self.image_store = ImageStore(config.image_store_dir)
+        self.insert_sql = INSERT_STORE_SQL if self.image_store else INSERT_SQL
+        self.encoder = ImageEncoder.from_config(config)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        self.batch_size = max(1, config.db_batch_size)
+        self.batch_interval = config.db_batch_interval
+        self._pending_rows = []
+        self._batch_lock = threading.Lock()
+        # After a failed flush, full batches wait for the flush thread to retry
+        self._retry_after = 0.0
+        self._flush_thread = None
+        if self.batch_size > 1:
+            self._start_flush_thread()
+
+        self._pending_gauge = REGISTRY.gauge('katzenschreck_db_pending_rows',
+                                             'Rows buffered for the next batch insert')
+        REGISTRY.add_collector(self._collect_metrics)
+
+    def _get_pool(self):
+        """Creates the connection pool on first use (the DB may be down at startup)"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name=f'katzenschreck_{id(self)}',
+                    pool_size=self.config.db_pool_size,
+                    pool_reset_session=True,
+                    host=self.config.db_host,
+                    user=self.config.db_user,
+                    password=self.config.db_password,
+                    database=self.config.db_database
+                )
+            return self._pool
+
+    def warm_up(self) -> 'DatabaseHandler':
+        """Opens the connection pool now instead of on the first insert
+
+        A database that is down is not fatal: the error is logged and the
+        pool is created on first use as before.
+        """
+        connection = self.get_connection()
+        if connection is not None:
+            connection.close()
+        return self
+
+    def _acquire(self):
+        """Takes a connection from the pool, waiting up to db_pool_timeout if it is exhausted
+
+        MySQLConnectionPool.get_connection() raises PoolError instead of
+        waiting when every connection is in use.
+        """
+        pool = self._get_pool()
+        deadline = time.monotonic() + self.config.db_pool_timeout
+        delay = 0.01
+        while True:
+            try:
+                return pool.get_connection()
+            except PoolError:
+                if time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+
+    def get_connection(self):
+        """Returns a healthy pooled connection, or None"""
         try:
-            connection = mysql.connector.connect(
-                host=self.config.db_host,
-                user=self.config.db_user,
-                password=self.config.db_password,
-                database=self.config.db_database
-            )
+            connection = self._acquire()
+            # Health check: pooled connections may have been closed by the server
+            connection.ping(reconnect=True, attempts=2, delay=1)
             return connection
         except Error as e:
-            print(f"Database connection error: {e}")
+            logger.error("Database connection error: %s", e)
             return None
 
-    def save_frame_to_database(self, frame, accuracy: float = 0.0):
-        """Saves the current frame as JPEG and thumbnail to the database"""
-        connection = self._get_connection()
+    def _insert_rows(self, rows) -> bool:
+        """Inserts rows in one transaction (a multi-row INSERT for several rows)"""
+        connection = self.get_connection()
         if not connection:
+            DB_INSERT_FAILURES.inc()
             return False
 
+        start = time.perf_counter()
+        cursor = None
         try:
             cursor = connection.cursor()
-
-            # Convert frame to JPEG format (keeping original resolution)
-            success, jpeg_buffer = cv2.imencode('.jpg', frame)
-            if not success:
-                print("Error converting frame to JPEG")
-                return False
-
-            jpeg_data = jpeg_buffer.tobytes()
-
-            # Create thumbnail with 300 pixel width
-            thumbnail_data = self._create_thumbnail(frame, 300)
-            if not thumbnail_data:
-                print("Error creating thumbnail")
-                return False
-
-            # Execute insert statement
-            sql = """
-            INSERT INTO detections_images (camera_name, accuracy, blob_jpeg, thumbnail_jpeg)
-            VALUES (%s, %s, %s, %s)
-            """
-            values = (self.config.camera_name, accuracy, jpeg_data, thumbnail_data)
-
-            cursor.execute(sql, values)
+            if len(rows) == 1:
+                cursor.execute(self.insert_sql, rows[0])
+            else:
+                # mysql.connector turns this into one multi-row INSERT
+                cursor.executemany(self.insert_sql, rows)
             connection.commit()
-
-            print(f"Frame successfully saved to database "
-                  f"(Original size: {len(jpeg_data)} bytes, "
-                  f"Thumbnail: {len(thumbnail_data)} bytes)")
-            cursor.close()
-            connection.close()
+            DB_INSERT_SECONDS.observe(time.perf_counter() - start)
             return True
-
         except Error as e:
-            print(f"Error saving to database: {e}")
-            if connection:
-                connection.close()
+            logger.error("Error saving to database: %s", e)
+            DB_INSERT_FAILURES.inc()
+            try:
+                connection.rollback()
+            except Error:
+                pass
             return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            # Returns the connection to the pool
+            connection.close()
 
-    def _create_thumbnail(self, frame, target_width: int):
-        """Creates a thumbnail with the specified width while maintaining aspect ratio"""
-        try:
-            height, width = frame.shape[:2]
-
-            # Calculate new height based on aspect ratio
-            aspect_ratio = height / width
-            target_height = int(target_width * aspect_ratio)
+    def _start_flush_thread(self):
+        """Starts the thread that flushes partial batches after batch_interval"""
+        self._flush_thread = threading.Thread(target=self._flush_loop)
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+
+    def _flush_loop(self):
+        """Flushes pending rows every batch interval"""
+        while True:
+            time.sleep(self.batch_interval)
+            self.flush()
+
+    def _collect_metrics(self):
+        """Refreshes the pending rows gauge before a metrics scrape"""
+        with self._batch_lock:
+            self._pending_gauge.set(len(self._pending_rows))
+
+    def flush(self) -> bool:
+        """Writes all pending rows"""
+        with self._batch_lock:
+            rows = self._pending_rows
+            self._pending_rows = []
+        if not rows:
+            return True
 
-            # Scale frame to thumbnail size
-            thumbnail = cv2.resize(frame, (target_width, target_height),
-                                  interpolation=cv2.INTER_AREA)
+        success = self._insert_rows(rows)
+        if success:
+            logger.debug("%d frames saved to database in one batch", len(rows))
+            return True
 
-            # Convert thumbnail to JPEG format
-            success, thumbnail_buffer = cv2.imencode(
-                '.jpg', thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not success:
-                return None
+        # Image files of these rows are already written: keep the rows for the
+        # next flush, in front of the ones queued meanwhile
+        with self._batch_lock:
+            self._pending_rows = rows + self._pending_rows
+            dropped = len(self._pending_rows) - self.batch_size * self.MAX_PENDING_BATCHES
+            if dropped > 0:
+                del self._pending_rows[:dropped]
+            self._retry_after = time.monotonic() + self.batch_interval
+        if dropped > 0:
+            logger.error("Database unavailable, dropped %d oldest pending rows", dropped)
+        else:
+            logger.warning("Batch insert failed, %d rows kept for the next flush", len(rows))
+        return False
+
+    def save_frame_to_database(self, frame, accuracy: float = 0.0,
+                               camera_name: Optional[str] = None):
+        """Saves the current frame as JPEG and thumbnail to the database
+
+        camera_name overrides the configured camera, so cameras in
+        multi-camera mode can share one handler (and pool).
+        """
+        try:
+            encoded = self.encoder.encode(frame)
+        except (cv2.error, ValueError, TypeError) as e:
+            logger.error("Error converting frame to JPEG: %s", e)
+            return False
+        return self.save_encoded_to_database(encoded, accuracy, camera_name)
+
+    def save_encoded_to_database(self, encoded: EncodedImage, accuracy: float = 0.0,
+                                 camera_name: Optional[str] = None):
+        """Saves an already encoded JPEG and thumbnail to the database"""
+        camera_name = camera_name or self.config.camera_name
+        if self.image_store:
+            try:
+                image_path, image_size, image_sha256 = self.image_store.put(encoded.jpeg)
+            except OSError as e:
+                logger.error("Error writing image to store: %s", e)
+                return False
+            row = (camera_name, accuracy, image_path, image_size, image_sha256,
+                   encoded.thumbnail)
+        else:
+            row = (camera_name, accuracy, encoded.jpeg, encoded.thumbnail)
+
+        if self.batch_size > 1:
+            with self._batch_lock:
+                self._pending_rows.append(row)
+                batch_full = (len(self._pending_rows) >= self.batch_size
+                              and time.monotonic() >= self._retry_after)
+            if batch_full:
+                return self.flush()
+            return True
 
-            return thumbnail_buffer.tobytes()
+        if not self._insert_rows([row]):
+            return False
 
-        except (cv2.error, ValueError, TypeError) as e:
-            print(f"Error creating thumbnail: {e}")
-            return None
+        logger.debug("Frame successfully saved to database "
+                     "(Original size: %d bytes, Thumbnail: %d bytes)",
+                     len(encoded.jpeg), len(encoded.thumbnail))
+        return True
@@ -0,0 +1,278 @@
+"""Time-based retention and downsampling for detections_images"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from mysql.connector import Error
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.config import Config
+from cat_detector.database_handler import DatabaseHandler
+
+
+logger = logging.getLogger(__name__)
+
+
+# Oldest rows first via idx_created_at; {condition} selects snapshots or detections
+SELECT_EXPIRED_SQL = """
+SELECT id, image_path, image_sha256 FROM detections_images
+WHERE created_at < %s AND {condition}
+ORDER BY created_at
+LIMIT %s
+"""
+
+SELECT_REFERENCED_SQL = "SELECT 1 FROM detections_images WHERE image_sha256 = %s LIMIT 1"
+
+SELECT_CAMERAS_SQL = "SELECT DISTINCT camera_name FROM detections_images"
+
+# Cutoffs use the database clock: created_at is in the server's time zone
+SELECT_NOW_SQL = "SELECT NOW()"
+
+# Metadata only, served by idx_camera_created without touching the blobs; one
+# page of a day, continuing after the (created_at, id) of the previous page
+SELECT_DAY_SQL = """
+SELECT id, image_path, image_sha256, accuracy, created_at FROM detections_images
+WHERE camera_name = %s AND created_at >= %s AND created_at < %s AND accuracy > 0
+AND (created_at > %s OR id > %s)
+ORDER BY created_at, id
+LIMIT %s
+"""
+
+SELECT_OLDEST_SQL = """
+SELECT MIN(created_at) FROM detections_images
+WHERE camera_name = %s AND accuracy > 0
+"""
+
+
+class DatabaseRetentionJob:  # pylint: disable=too-many-instance-attributes
+    """Prunes and downsamples detections_images in small indexed batches
+
+    Policy (all ages in days, 0 disables a step):
+    - hourly snapshots (accuracy = 0) are deleted after snapshot_days
+    - detections are all kept for keep_all_days, then only the best one per
+      hour until hourly_days, then only the best one per day
+    - detections older than max_days are deleted
+
+    Rows are selected by idx_created_at / idx_camera_created and deleted by
+    primary key, at most batch_size per transaction with a short pause in
+    between, so inserts from the detection loop are never blocked for long.
+    Image store files are removed once no remaining row references them.
+    """
+
+    def __init__(self, config: Config, db_handler: DatabaseHandler):
+        self.config = config
+        self.db_handler = db_handler
+        self.image_store = db_handler.image_store
+        self.snapshot_days = config.retention_snapshot_days
+        self.keep_all_days = config.retention_keep_all_days
+        self.hourly_days = config.retention_hourly_days
+        self.max_days = config.retention_max_days
+        self.interval = config.db_retention_interval
+        self.batch_size = config.db_retention_batch_size
+        self.batch_pause = 0.1
+
+        # Days before this are already downsampled: {(camera, granularity): datetime}
+        self._downsampled_until: Dict[tuple, datetime] = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.rows_deleted = 0
+
+    def _delete_expired(self, condition: str, cutoff: datetime) -> int:
+        """Deletes rows older than cutoff in batches until none is left"""
+        sql = SELECT_EXPIRED_SQL.format(condition=condition)
+        deleted = 0
+        while not self._stop_event.is_set():
+            rows = self._query(sql, (cutoff, self.batch_size))
+            batch_deleted = self._delete_rows(rows)
+            deleted += batch_deleted
+            # No connection (or nothing deletable): the same batch would come back
+            if len(rows) < self.batch_size or batch_deleted == 0:
+                break
+        return deleted
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        """Executes one statement in its own transaction, returns affected rows"""
+        connection = self.db_handler.get_connection()
+        if not connection:
+            return 0
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            connection.commit()
+            return cursor.rowcount
+        finally:
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        """Runs a SELECT and returns all rows"""
+        connection = self.db_handler.get_connection()
+        if not connection:
+            return []
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+    def _delete_rows(self, rows: List[tuple]) -> int:
+        """Deletes (id, image_path, image_sha256) rows by primary key in batches"""
+        deleted = 0
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            deleted += self._execute(
+                f"DELETE FROM detections_images WHERE id IN ({placeholders})",
+                tuple(row[0] for row in chunk))
+            self._remove_unreferenced_images(chunk)
+            time.sleep(self.batch_pause)
+        return deleted
+
+    def _remove_unreferenced_images(self, rows: List[tuple]):
+        """Removes image store files of deleted rows unless still referenced"""
+        if not self.image_store:
+            return
+        images = {sha256: path for _, path, sha256 in rows if sha256}
+        for sha256, path in images.items():
+            # Identical images are stored once and may be shared by other rows
+            if self._query(SELECT_REFERENCED_SQL, (sha256,)):
+                continue
+            try:
+                os.remove(self.image_store.absolute_path(path))
+            except OSError:
+                continue  # Already gone
+
+    @staticmethod
+    def _bucket(created_at: datetime, granularity: str) -> datetime:
+        """Returns the hour or day a row belongs to"""
+        if granularity == 'hour':
+            return created_at.replace(minute=0, second=0, microsecond=0)
+        return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _downsample(self, camera: str, granularity: str, start: datetime,
+                    end: datetime) -> int:
+        """Keeps only the best detection per hour/day between start and end"""
+        key = (camera, granularity)
+        # The first window starts at start itself, not at its midnight, so
+        # rows before start (another granularity's range) are never rescanned
+        day = max(start, self._downsampled_until.get(key, start))
+        deleted = 0
+
+        # One day per window, read in batch_size pages: every SELECT stays
+        # small and index-bound
+        while day < end and not self._stop_event.is_set():
+            next_midnight = (day.replace(hour=0, minute=0, second=0, microsecond=0)
+                             + timedelta(days=1))
+            day_end = min(next_midnight, end)
+            deleted += self._downsample_window(camera, granularity, day, day_end)
+            if day_end == next_midnight and not self._stop_event.is_set():
+                # Only fully processed days are skipped next time
+                self._downsampled_until[key] = day_end
+            day = day_end
+        return deleted
+
+    def _downsample_window(self, camera: str, granularity: str, start: datetime,
+                           end: datetime) -> int:
+        """Downsamples start..end (at most one day) in pages of batch_size rows"""
+        best = {}
+        deleted = 0
+        cursor_time, cursor_id = start, 0
+        while not self._stop_event.is_set():
+            rows = self._query(SELECT_DAY_SQL, (camera, cursor_time, end, cursor_time,
+                                                cursor_id, self.batch_size))
+            losers = []
+            for row in rows:
+                accuracy, created_at = row[3], row[4]
+                bucket = self._bucket(created_at, granularity)
+                if bucket not in best:
+                    best[bucket] = (accuracy, row[:3])
+                elif accuracy > best[bucket][0]:
+                    losers.append(best[bucket][1])
+                    best[bucket] = (accuracy, row[:3])
+                else:
+                    losers.append(row[:3])
+            # Deleting behind the cursor does not shift the next page
+            deleted += self._delete_rows(losers)
+            if len(rows) < self.batch_size:
+                break
+            cursor_time, cursor_id = rows[-1][4], rows[-1][0]
+        return deleted
+
+    def _oldest_detection(self, camera: str):
+        """Returns the creation time of the oldest detection of a camera"""
+        rows = self._query(SELECT_OLDEST_SQL, (camera,))
+        return rows[0][0] if rows and rows[0][0] else None
+
+    def run_once(self) -> int:
+        """Applies all retention policies once, returns the number of deleted rows"""
+        rows = self._query(SELECT_NOW_SQL)
+        if not rows:
+            return 0
+        now = rows[0][0]
+        deleted = 0
+
+        if self.snapshot_days > 0:
+            deleted += self._delete_expired('accuracy = 0',
+                                            now - timedelta(days=self.snapshot_days))
+        if self.max_days > 0:
+            deleted += self._delete_expired('accuracy > 0',
+                                            now - timedelta(days=self.max_days))
+
+        if self.keep_all_days > 0:
+            keep_all_cutoff = now - timedelta(days=self.keep_all_days)
+            hourly_cutoff = keep_all_cutoff
+            if self.hourly_days > self.keep_all_days:
+                hourly_cutoff = now - timedelta(days=self.hourly_days)
+
+            for (camera,) in self._query(SELECT_CAMERAS_SQL):
+                oldest = self._oldest_detection(camera)
+                if oldest is None:
+                    continue
+                # Best per day before the hourly window, best per hour inside it
+                if oldest < hourly_cutoff:
+                    deleted += self._downsample(camera, 'day', oldest, hourly_cutoff)
+                if hourly_cutoff < keep_all_cutoff:
+                    deleted += self._downsample(camera, 'hour',
+                                                max(oldest, hourly_cutoff),
+                                                keep_all_cutoff)
+
+        self.rows_deleted += deleted
+        if deleted:
+            logger.info("Database retention: deleted %d rows", deleted)
+        return deleted
+
+    def _run(self):
+        """Applies the policies every interval"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Error as e:
+                logger.error("Error in database retention: %s", e)
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """Starts the retention job in the background"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the retention job"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
@@ -0,0 +1,142 @@
+"""Visit-level deduplication of detections across frames"""
+
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+
+class VisitEvent:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """One cat visit: consecutive detections associated to the same track"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, class_id: int, confidence: float, bbox: List[float], now: float):
+        self.event_id = next(self._ids)
+        self.class_id = class_id
+        self.bbox = bbox
+        self.start_time = now
+        self.last_seen = now
+        self.last_stored = now
+        self.hits = 1
+        self.max_confidence = confidence
+
+        # Best frame since the last time this event was stored:
+        # (confidence, frame, accepted detections, timestamp)
+        self.pending_best = None
+
+    def offer_frame(self, confidence: float, snapshot: Tuple):
+        """Keeps the snapshot if it is the best one since the last store"""
+        self.max_confidence = max(self.max_confidence, confidence)
+        if self.pending_best is None or confidence > self.pending_best[0]:
+            self.pending_best = (confidence,) + snapshot
+
+    def take_best(self):
+        """Returns and clears the best pending snapshot"""
+        best = self.pending_best
+        self.pending_best = None
+        return best
+
+
+class DetectionTracker:
+    """Groups detections into visit events with IoU/centroid association
+
+    A detection continues an active event of the same class if its box
+    overlaps the event's last box by at least iou_threshold, or if its centre
+    is within max_centroid_distance (fraction of the frame diagonal). Events
+    without a matching detection for end_timeout seconds end. Only the
+    best-confidence frame per event is kept for storage; with store_interval
+    > 0, the best frame of every interval is stored while the visit lasts.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_centroid_distance: float = 0.15,
+                 end_timeout: float = 10.0, store_interval: float = 0.0):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.end_timeout = end_timeout
+        self.store_interval = store_interval
+        self.active_events: List[VisitEvent] = []
+
+    @staticmethod
+    def _iou(box_a: List[float], box_b: List[float]) -> float:
+        """Intersection over union of two [x1, y1, x2, y2] boxes"""
+        inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+        inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+        if inter_w <= 0 or inter_h <= 0:
+            return 0.0
+        intersection = inter_w * inter_h
+        area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+        area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+        return intersection / (area_a + area_b - intersection)
+
+    @staticmethod
+    def _centroid_distance(box_a: List[float], box_b: List[float],
+                           frame_shape: Tuple[int, int]) -> float:
+        """Centre distance of two boxes as a fraction of the frame diagonal"""
+        frame_h, frame_w = frame_shape[:2]
+        dx = (box_a[0] + box_a[2] - box_b[0] - box_b[2]) / 2
+        dy = (box_a[1] + box_a[3] - box_b[1] - box_b[3]) / 2
+        return (dx * dx + dy * dy) ** 0.5 / (frame_w * frame_w + frame_h * frame_h) ** 0.5
+
+    def _match(self, class_id: int, bbox: List[float], frame_shape,
+               taken: set) -> Optional[VisitEvent]:
+        """Finds the active event that best matches a detection"""
+        best_event, best_score = None, 0.0
+        for event in self.active_events:
+            if event.class_id != class_id or id(event) in taken:
+                continue
+            iou = self._iou(bbox, event.bbox)
+            if iou >= self.iou_threshold:
+                score = 1.0 + iou  # IoU matches win over centroid matches
+            else:
+                distance = self._centroid_distance(bbox, event.bbox, frame_shape)
+                if distance > self.max_centroid_distance:
+                    continue
+                score = 1.0 - distance
+            if score > best_score:
+                best_event, best_score = event, score
+        return best_event
+
+    def update(self, accepted, frame, timestamp: str,
+               now: Optional[float] = None) -> List[VisitEvent]:
+        """Associates the accepted detections of a frame, returns the events that started"""
+        now = time.monotonic() if now is None else now
+        started = []
+        taken = set()
+
+        # Highest confidence first, so the best box claims the track
+        for class_id, confidence, bbox in sorted(accepted, key=lambda det: -det[1]):
+            event = self._match(class_id, bbox, frame.shape, taken)
+            if event is None:
+                event = VisitEvent(class_id, confidence, bbox, now)
+                self.active_events.append(event)
+                started.append(event)
+            else:
+                event.bbox = bbox
+                event.last_seen = now
+                event.hits += 1
+            taken.add(id(event))
+            event.offer_frame(confidence, (frame, accepted, timestamp))
+
+        return started
+
+    def collect_ended(self, now: Optional[float] = None) -> List[VisitEvent]:
+        """Removes and returns the events that have not been seen for end_timeout"""
+        now = time.monotonic() if now is None else now
+        ended = [event for event in self.active_events
+                 if now - event.last_seen >= self.end_timeout]
+        if ended:
+            self.active_events = [event for event in self.active_events
+                                  if now - event.last_seen < self.end_timeout]
+        return ended
+
+    def collect_due(self, now: Optional[float] = None) -> List[VisitEvent]:
+        """Returns the active events whose periodic store interval has elapsed"""
+        if self.store_interval <= 0:
+            return []
+        now = time.monotonic() if now is None else now
+        due = []
+        for event in self.active_events:
+            if event.pending_best and now - event.last_stored >= self.store_interval:
+                event.last_stored = now
+                due.append(event)
+        return due
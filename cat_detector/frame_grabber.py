@@ -0,0 +1,166 @@
+"""Background RTSP frame capture for the cat deterrent system"""
+
+import logging
+import threading
+import time
+from typing import Optional
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.capture_backends import CaptureBackend
+from cat_detector.metrics import STAGE_SECONDS
+from cat_detector.startup import STARTUP
+
+
+logger = logging.getLogger(__name__)
+
+
+class FrameGrabber:  # pylint: disable=too-many-instance-attributes
+    """Drains a video stream in a background thread, keeping only the newest frame
+
+    Inference is usually slower than the camera frame rate. Reading frames in
+    the inference loop lets the OpenCV/FFmpeg buffer fill up, so detections lag
+    further and further behind real time. The grabber reads continuously into a
+    single slot; frames that are overwritten before the consumer picks them up
+    are counted as dropped.
+    """
+
+    def __init__(self, stream_url: str, reconnect_delay: float = 5.0, name: str = '',
+                 backend: Optional[CaptureBackend] = None):
+        self.stream_url = stream_url
+        self.name = name
+        self.reconnect_delay = reconnect_delay
+        self.backend = backend or CaptureBackend()
+
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._frame_pending = False
+        self._running = False
+        self._thread = None
+        self._start_time = 0.0
+        self.connected = False
+        self.connect_seconds = None
+        # Live streams never end; file sources (see replay.py) set this at the end
+        self.finished = False
+
+        # Counters
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._latency_sum = 0.0
+
+    def start(self):
+        """Starts the capture thread"""
+        if self._running:
+            return
+        self._running = True
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._capture_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the capture thread and wakes up waiting readers"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.reconnect_delay + 1)
+            self._thread = None
+
+    def _open_capture(self):
+        """Opens the video stream with the configured capture backend"""
+        return self.backend.open(self.stream_url)
+
+    def _capture_loop(self):
+        """Reads frames as fast as the stream delivers them, reconnecting on errors"""
+        while self._running:
+            cap = self._open_capture()
+
+            if not cap.isOpened():
+                logger.error("Error opening RTSP stream: %s. Retrying in %.0f seconds...",
+                             self.stream_url, self.reconnect_delay)
+                cap.release()
+                time.sleep(self.reconnect_delay)
+                continue
+
+            if self.connect_seconds is None:
+                # Time from start() to the first connection, part of the startup report
+                self.connect_seconds = time.perf_counter() - self._start_time
+                STARTUP.record(f'stream {self.name}'.strip(), self.connect_seconds)
+                logger.info("RTSP stream connection established in %.1f s.",
+                            self.connect_seconds)
+            else:
+                logger.info("RTSP stream connection established successfully.")
+            self.connected = True
+
+            while self._running:
+                read_start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    logger.warning("RTSP stream interrupted, reconnecting...")
+                    break
+                # Mostly waiting for the next frame (about 1/fps) on a live
+                # stream, so this is the read time, not the decode time
+                STAGE_SECONDS.observe(time.perf_counter() - read_start,
+                                      camera=self.name, stage='capture_read')
+                self._publish_frame(frame)
+
+            self.connected = False
+            cap.release()
+
+    def _publish_frame(self, frame):
+        """Stores a frame in the slot, replacing the previous one"""
+        with self._condition:
+            if self._frame_pending:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._frame_time = time.monotonic()
+            self._frame_pending = True
+            self.frames_captured += 1
+            self._condition.notify()
+
+    def has_frame(self) -> bool:
+        """Returns True if an unread frame is waiting in the slot"""
+        with self._condition:
+            return self._frame_pending
+
+    def read(self, timeout: float = 1.0):
+        """Returns the newest unread frame, or None if none arrived within timeout"""
+        with self._condition:
+            if not self._frame_pending:
+                self._condition.wait(timeout)
+            if not self._frame_pending:
+                return None
+
+            frame = self._frame
+            self._frame = None
+            self._frame_pending = False
+
+            latency = time.monotonic() - self._frame_time
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self._latency_sum += latency
+            self.frames_delivered += 1
+            return frame
+
+    def get_stats(self) -> dict:
+        """Returns capture counters and capture-to-inference latency statistics"""
+        with self._condition:
+            delivered = self.frames_delivered
+            return {
+                'connected': self.connected,
+                'frames_captured': self.frames_captured,
+                'frames_delivered': delivered,
+                'frames_dropped': self.frames_dropped,
+                'last_latency_ms': self.last_latency * 1000,
+                'avg_latency_ms': (self._latency_sum / delivered * 1000
+                                   if delivered else 0.0),
+                'max_latency_ms': self.max_latency * 1000
+            }
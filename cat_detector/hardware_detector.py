@@ -1,14 +1,33 @@
 """Hardware detection for automatic model selection"""
 
+import json
+import logging
 import platform
 import subprocess
+import threading
 import os
 from typing import Tuple, Optional
 
 
+logger = logging.getLogger(__name__)
+
+# Bump when a probe changes, so results stored on disk are probed again
+PROBE_VERSION = 1
+
+
 class HardwareDetector:
     """Detects hardware platform and suggests optimal YOLO model"""
     
+    # Probe results are shared by all instances of the process: the
+    # tegrastats check alone can take up to 5 seconds
+    _probe_cache = {}
+    _probe_lock = threading.Lock()
+    
+    # The device type probes are also kept on disk (see use_cache_file), so a
+    # restarted container skips them; cheap probes like memory always run
+    PERSISTED_PROBES = ('is_jetson', 'is_raspberry_pi')
+    _cache_file = None
+    
     def __init__(self, forced_type: Optional[str] = None):
         """
         Initialize hardware detector
@@ -16,20 +35,74 @@ class HardwareDetector:
         Args:
             forced_type: Optional hardware type override ('jetson', 'raspberry_pi', 'generic')
         """
-        self.platform = self._detect_platform()
+        self.platform = self._probe('platform', self._detect_platform)
         
         if forced_type:
             # Use forced hardware type instead of auto-detection
             self.is_jetson = forced_type.lower() == 'jetson'
             self.is_raspberry_pi = forced_type.lower() == 'raspberry_pi'
-            print(f"🔧 Hardware type forced to: {forced_type}")
+            logger.info("Hardware type forced to: %s", forced_type)
         else:
             # Auto-detect hardware
-            self.is_jetson = self._is_jetson_device()
-            self.is_raspberry_pi = self._is_raspberry_pi()
+            self.is_jetson = self._probe('is_jetson', self._is_jetson_device)
+            self.is_raspberry_pi = self._probe('is_raspberry_pi', self._is_raspberry_pi)
         
-        self.memory_gb = self._get_memory_gb()
-        self.cpu_cores = self._get_cpu_cores()
+        self.memory_gb = self._probe('memory_gb', self._get_memory_gb)
+        self.cpu_cores = self._probe('cpu_cores', self._get_cpu_cores)
+    
+    @classmethod
+    def use_cache_file(cls, path: str):
+        """
+        Keep the device type probe results in path across restarts
+        
+        Stored results are only used while device model, architecture,
+        kernel, Python version and PROBE_VERSION are unchanged.
+        """
+        with cls._probe_lock:
+            cls._cache_file = path
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f).get(cls._probe_cache_key(), {})
+            except (OSError, ValueError, AttributeError):
+                stored = {}
+            for name in cls.PERSISTED_PROBES:
+                if name in stored:
+                    cls._probe_cache.setdefault(name, stored[name])
+    
+    @classmethod
+    def _probe_cache_key(cls) -> str:
+        """Key of the stored probe results, changes with the hardware or software"""
+        return json.dumps({
+            'device_model': cls._get_device_model(),
+            'machine': platform.machine(),
+            'kernel': platform.release(),
+            'python': platform.python_version(),
+            'probe_version': PROBE_VERSION
+        }, sort_keys=True)
+    
+    @classmethod
+    def _store_probes(cls):
+        """Writes the persisted probe results to the cache file (lock held)"""
+        probes = {name: cls._probe_cache[name] for name in cls.PERSISTED_PROBES
+                  if name in cls._probe_cache}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cls._cache_file)), exist_ok=True)
+            temp_file = f'{cls._cache_file}.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({cls._probe_cache_key(): probes}, f, indent=2)
+            os.replace(temp_file, cls._cache_file)
+        except OSError as e:
+            logger.warning("Could not store hardware probe results: %s", e)
+    
+    @classmethod
+    def _probe(cls, name: str, probe):
+        """Runs a hardware probe once (per process or cache file) and returns the result"""
+        with cls._probe_lock:
+            if name not in cls._probe_cache:
+                cls._probe_cache[name] = probe()
+                if cls._cache_file and name in cls.PERSISTED_PROBES:
+                    cls._store_probes()
+            return cls._probe_cache[name]
     
     def _detect_platform(self) -> str:
         """Detect the current platform"""
@@ -114,6 +187,72 @@ class HardwareDetector:
             else:
                 return 'yolo11m.pt', 'requirements.txt'
     
+    @staticmethod
+    def _get_device_model() -> str:
+        """Get the device model string (e.g. 'Raspberry Pi 4 Model B Rev 1.4')"""
+        try:
+            if os.path.exists('/proc/device-tree/model'):
+                with open('/proc/device-tree/model', 'r') as f:
+                    return f.read().strip().strip('\x00')
+        except Exception:
+            pass
+        return platform.machine()
+    
+    def get_fingerprint(self) -> dict:
+        """
+        Get a stable description of the hardware for caching benchmark results
+        
+        Returns:
+            Dictionary that changes when the device or its resources change
+        """
+        return {
+            'platform': self.platform,
+            'device_model': self._get_device_model(),
+            'memory_gb': round(self.memory_gb),
+            'cpu_cores': self.cpu_cores
+        }
+    
+    def get_cpu_load(self) -> float:
+        """Get the 1-minute load average per CPU core (1.0 = all cores busy)"""
+        try:
+            return os.getloadavg()[0] / self.cpu_cores
+        except (OSError, AttributeError):
+            return 0.0
+    
+    def get_memory_usage(self) -> float:
+        """Get the fraction of memory in use (0.0-1.0)"""
+        try:
+            values = {}
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    key, value = line.split(':', 1)
+                    values[key] = int(value.split()[0])
+            return 1.0 - values['MemAvailable'] / values['MemTotal']
+        except Exception:
+            return 0.0
+    
+    def get_temperature(self) -> Optional[float]:
+        """
+        Get the SoC temperature in degrees Celsius
+        
+        Returns:
+            Highest thermal zone reading (Raspberry Pi and Jetson), None if unavailable
+        """
+        temperatures = []
+        thermal_root = '/sys/class/thermal'
+        try:
+            for zone in os.listdir(thermal_root):
+                if not zone.startswith('thermal_zone'):
+                    continue
+                try:
+                    with open(os.path.join(thermal_root, zone, 'temp'), 'r') as f:
+                        temperatures.append(int(f.read().strip()) / 1000.0)
+                except (OSError, ValueError):
+                    continue
+        except OSError:
+            return None
+        return max(temperatures) if temperatures else None
+    
     def get_hardware_info(self) -> dict:
         """Get detailed hardware information"""
         return {
@@ -0,0 +1,104 @@
+"""Encode-once JPEG and thumbnail generation"""
+
+import importlib.util
+import io
+import cv2
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+ENCODER_BACKENDS = ('opencv', 'turbojpeg', 'pil')
+
+
+class EncodedImage:  # pylint: disable=too-few-public-methods
+    """Full-size JPEG and thumbnail of one frame, shared by all sinks"""
+
+    def __init__(self, jpeg: bytes, thumbnail: bytes, width: int, height: int):
+        self.jpeg = jpeg
+        self.thumbnail = thumbnail
+        self.width = width
+        self.height = height
+
+
+class ImageEncoder:
+    """Encodes a frame once into a full-size JPEG and a thumbnail
+
+    The disk and database sinks receive the same bytes instead of encoding the
+    frame themselves. Backends: 'opencv' (cv2.imencode), 'turbojpeg'
+    (PyTurboJPEG, libjpeg-turbo directly) and 'pil' (Pillow / Pillow-SIMD).
+    'auto' uses turbojpeg when it is installed and opencv otherwise. All
+    backends take a BGR frame and return baseline JPEG bytes.
+    """
+
+    def __init__(self, quality: int = 95, thumbnail_width: int = 300,
+                 thumbnail_quality: int = 85, backend: str = 'auto'):
+        self.quality = quality
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_quality = thumbnail_quality
+        self.backend = self._resolve_backend(backend.lower())
+        self._turbojpeg = None
+
+        if self.backend == 'turbojpeg':
+            from turbojpeg import TurboJPEG  # pylint: disable=import-outside-toplevel
+            try:
+                self._turbojpeg = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                # The Python package is there, but libturbojpeg is not
+                logger.warning("libjpeg-turbo not usable (%s), using opencv", e)
+                self.backend = 'opencv'
+
+    @classmethod
+    def from_config(cls, config) -> 'ImageEncoder':
+        """Creates an encoder from the application configuration"""
+        return cls(quality=config.jpeg_quality,
+                   thumbnail_width=config.thumbnail_width,
+                   thumbnail_quality=config.thumbnail_quality,
+                   backend=config.jpeg_encoder)
+
+    @staticmethod
+    def _resolve_backend(backend: str) -> str:
+        """Picks the encoder backend, falling back to OpenCV"""
+        modules = {'turbojpeg': 'turbojpeg', 'pil': 'PIL'}
+        if backend == 'auto':
+            backend = 'turbojpeg'
+        if backend not in ENCODER_BACKENDS:
+            logger.warning("Unknown JPEG encoder %s, using opencv", backend)
+            return 'opencv'
+        if backend in modules and importlib.util.find_spec(modules[backend]) is None:
+            return 'opencv'
+        return backend
+
+    def _encode_jpeg(self, frame, quality: int) -> bytes:
+        """Encodes a BGR frame to JPEG bytes with the selected backend"""
+        if self.backend == 'turbojpeg':
+            return self._turbojpeg.encode(frame, quality=quality)
+
+        if self.backend == 'pil':
+            from PIL import Image  # pylint: disable=import-outside-toplevel
+            buffer = io.BytesIO()
+            Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).save(
+                buffer, format='JPEG', quality=quality)
+            return buffer.getvalue()
+
+        success, jpeg_buffer = cv2.imencode('.jpg', frame,
+                                            [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            raise ValueError("Error converting frame to JPEG")
+        return jpeg_buffer.tobytes()
+
+    def _create_thumbnail(self, frame):
+        """Scales the frame to thumbnail width while maintaining aspect ratio"""
+        height, width = frame.shape[:2]
+        target_height = int(self.thumbnail_width * height / width)
+        return cv2.resize(frame, (self.thumbnail_width, target_height),
+                          interpolation=cv2.INTER_AREA)
+
+    def encode(self, frame) -> EncodedImage:
+        """Encodes the full-size JPEG and the thumbnail of a frame"""
+        height, width = frame.shape[:2]
+        jpeg = self._encode_jpeg(frame, self.quality)
+        thumbnail = self._encode_jpeg(self._create_thumbnail(frame),
+                                      self.thumbnail_quality)
+        return EncodedImage(jpeg, thumbnail, width, height)
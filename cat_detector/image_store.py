@@ -0,0 +1,56 @@
+"""Content-addressed on-disk store for full-size detection images"""
+
+import hashlib
+import os
+import tempfile
+from typing import Tuple
+
+
+class ImageStore:
+    """Stores images in a sharded directory tree keyed by their SHA-256 hash
+
+    An image with hash "ab12cd..." lives at <root>/ab/12/ab12cd....jpg. Writes
+    go to a temporary file in the target directory first and are renamed into
+    place, so readers never see a partially written image. Identical images
+    are stored only once.
+    """
+
+    def __init__(self, root: str, extension: str = '.jpg'):
+        self.root = root
+        self.extension = extension
+
+    def relative_path(self, sha256: str) -> str:
+        """Returns the path of an image relative to the store root"""
+        return os.path.join(sha256[:2], sha256[2:4], f'{sha256}{self.extension}')
+
+    def absolute_path(self, relative_path: str) -> str:
+        """Returns the absolute path for a path stored in the database"""
+        return os.path.join(self.root, relative_path)
+
+    def put(self, data: bytes) -> Tuple[str, int, str]:
+        """Stores image bytes, returns (relative path, size, sha256)"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        relative_path = self.relative_path(sha256)
+        target = self.absolute_path(relative_path)
+
+        if not os.path.exists(target):
+            directory = os.path.dirname(target)
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(file_descriptor, 'wb') as file:
+                    file.write(data)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_path, target)
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        return relative_path, len(data), sha256
+
+    def get(self, relative_path: str) -> bytes:
+        """Reads image bytes by their stored path"""
+        with open(self.absolute_path(relative_path), 'rb') as file:
+            return file.read()
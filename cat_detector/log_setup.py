@@ -0,0 +1,140 @@
+"""Logging configuration: text or JSON output, rate limiting and aggregation"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, TextIO, Tuple
+
+
+LOG_FORMATS = ('text', 'json')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# LogRecord attributes that are not user supplied extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line
+
+    Fields passed with extra={...} are added to the object, so log shippers
+    can filter on e.g. the camera name without parsing the message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most burst INFO/DEBUG records per call site through within interval seconds
+
+    A call site is the source line of the logging call plus the camera
+    passed with extra={'camera': ...}, so a message that repeats every frame
+    (with varying arguments) is limited as a whole, while each camera keeps
+    its own budget. Warnings and errors are never limited. The number of
+    suppressed records is appended to the first record that gets through in
+    the next interval.
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._lock = threading.Lock()
+        # (path, line, camera) -> [window start, records passed, records suppressed]
+        self._sites: Dict[Tuple[str, int, Optional[str]], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno, getattr(record, 'camera', None))
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                self._sites[key] = [now, 1, 0]
+                return True
+            if now - site[0] >= self.interval:
+                suppressed = site[2]
+                site[:] = [now, 1, 0]
+            elif site[1] < self.burst:
+                site[1] += 1
+                return True
+            else:
+                site[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = (f"{record.getMessage()} ({suppressed} similar messages "
+                          f"suppressed in the last {self.interval:.0f} s)")
+            record.args = None
+        return True
+
+
+class LogAggregator:  # pylint: disable=too-few-public-methods
+    """Counts a frequent event and logs one summary line per interval
+
+    The message gets the count and the elapsed seconds as arguments, e.g.
+    "Resized %d frames in the last %.0f s". add() returns right away when
+    the level is disabled, so it can sit on the per-frame path. Not thread
+    safe: use one aggregator per thread.
+    """
+
+    def __init__(self, logger: logging.Logger, message: str, interval: float = 60.0,
+                 level: int = logging.INFO, extra: Optional[dict] = None):
+        self.logger = logger
+        self.message = message
+        self.interval = interval
+        self.level = level
+        self.extra = extra
+        self.count = 0
+        self._window_start = time.monotonic()
+
+    def add(self, count: int = 1):
+        """Counts count events, logging the summary once the interval is over"""
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.count += count
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.interval:
+            self.logger.log(self.level, self.message, self.count, elapsed, extra=self.extra)
+            self.count = 0
+            self._window_start = now
+
+
+def configure_logging(level: str = 'INFO', log_format: str = 'text',
+                      rate_limit: int = 5, rate_interval: float = 60.0,
+                      stream: Optional[TextIO] = None):
+    """Sets up the root logger: one handler (stdout by default), formatter and rate limit"""
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if log_format == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handler.addFilter(RateLimitFilter(rate_limit, rate_interval))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
@@ -7,8 +7,19 @@ import os
 # Add the parent directory to the Python path for absolute imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from cat_detector.config import Config
-from cat_detector.stream_processor import StreamProcessor
+from cat_detector.startup import STARTUP  # First import: starts the startup clock
+
+# torch/ultralytics are not imported here, they load with the model
+with STARTUP.stage('import modules'):
+    from cat_detector.config import Config, default_config_path
+    from cat_detector.stream_processor import StreamProcessor
+    from cat_detector.camera_scheduler import CameraScheduler
+    from cat_detector.db_retention import DatabaseRetentionJob
+    from cat_detector.hardware_detector import HardwareDetector
+    from cat_detector.object_detector import DEFAULT_MODEL_CACHE_DIR
+    from cat_detector.metrics import REGISTRY, MetricsServer, SystemCollector
+    from cat_detector.log_setup import configure_logging
+    from cat_detector.profiler import Profiler
 
 
 class KatzenschreckApp:  # pylint: disable=too-few-public-methods
@@ -16,18 +27,30 @@ class KatzenschreckApp:  # pylint: disable=too-few-public-methods
 
     def __init__(self):
         self.args = self._parse_arguments()
-        config_path = self._get_config_path()
-        self.config = Config(config_path)
-        self.processor = StreamProcessor(self.config, self.args.output_dir)
-
-    def _get_config_path(self):
-        """Determines the correct config.txt path (Docker or local)"""
-        # Check if running in Docker container
-        docker_config_path = '/app/config.txt'
-        if os.path.exists(docker_config_path):
-            return docker_config_path
-        # Default to local path
-        return '../config.txt'
+        self.config = Config(default_config_path())
+        configure_logging(self.config.log_level, self.config.log_format,
+                          self.config.log_rate_limit, self.config.log_rate_interval)
+        # Device type probes are stored next to calibration.json across restarts
+        HardwareDetector.use_cache_file(os.path.join(
+            self.config.model_cache_dir or DEFAULT_MODEL_CACHE_DIR, 'hardware_probes.json'))
+        if self.config.cameras:
+            # Multi-camera mode: one process, one shared model
+            self.processor = CameraScheduler(self.config, self.args.output_dir)
+        else:
+            self.processor = StreamProcessor(self.config, self.args.output_dir)
+        self.db_retention = None
+        if self.config.db_retention_enabled:
+            # One job per process, sharing the processor's connection pool
+            self.db_retention = DatabaseRetentionJob(self.config, self.processor.db_handler)
+        self.metrics_server = None
+        if self.config.metrics_enabled:
+            REGISTRY.add_collector(SystemCollector(HardwareDetector(self.config.hardware_type)))
+            self.metrics_server = MetricsServer(self.config.metrics_port,
+                                                self.config.metrics_host)
+        # Profiling windows run periodically if enabled, or on SIGUSR1
+        self.profiler = Profiler.from_config(self.config, self.args.output_dir)
+        self.profiler.install_signal_handler()
+        self.processor.profiler = self.profiler
 
     def _parse_arguments(self):
         """Parses command line arguments"""
@@ -39,7 +62,21 @@ class KatzenschreckApp:  # pylint: disable=too-few-public-methods
 
     def run(self):
         """Starts the application"""
-        self.processor.run()
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self.db_retention:
+            self.db_retention.start()
+        STARTUP.report()
+        try:
+            self.processor.run()
+        finally:
+            self.profiler.stop()
+            # After processor.run(), whose shutdown may still publish messages
+            self.processor.mqtt_handler.close()
+            if self.db_retention:
+                self.db_retention.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
 
 
 def main():
@@ -0,0 +1,302 @@
+"""Prometheus-style metrics and a small HTTP endpoint to scrape them"""
+
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# Latency buckets in seconds, from fast post-processing to slow CPU inference
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...],
+                   extra: str = '') -> str:
+    """Renders a label set as {a="1",b="2"}"""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Base class: one metric family with a fixed set of label names"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        """Returns the exposition lines of this metric family"""
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, key)} '
+                             f'{value}')
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increases the counter for the given labels"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels):
+        """Sets the gauge for the given labels"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """Records one observation"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum
+                state = [[0] * (len(self.buckets) + 1), 0.0]
+                self._values[key] = state
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager that observes the duration of its block"""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> Dict[tuple, Tuple[List[int], float]]:
+        """Returns a copy of the per-label bucket counts and sums"""
+        with self._lock:
+            return {key: (list(state[0]), state[1]) for key, state in self._values.items()}
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            items = [(key, list(state[0]), state[1])
+                     for key, state in sorted(self._values.items())]
+        for key, counts, total in items:
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class _Timer:  # pylint: disable=too-few-public-methods
+    """Observes the wall time of a with-block in a histogram"""
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class MetricsRegistry:
+    """Holds all metric families and renders them in the text exposition format
+
+    Collectors are callbacks run on every scrape; they refresh gauges whose
+    source of truth lives elsewhere (queue depths, grabber counters, system
+    load), so nothing has to be polled between scrapes.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        """Returns the counter with this name, creating it on first use"""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        """Returns the gauge with this name, creating it on first use"""
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram with this name, creating it on first use"""
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Registers a callback that updates gauges right before each scrape"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        """Unregisters a collector (e.g. when a processor stops)"""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """Runs the collectors and returns all metrics as exposition text"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # A broken collector must not take the whole endpoint down
+                logger.error("Metrics collector error: %s", e)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry, shared by all cameras and handlers
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'katzenschreck_stage_seconds',
+    'Processing time per pipeline stage (capture, capture_read, resize, motion, inference, '
+    'postprocess, mqtt, annotate, encode, disk, database)',
+    ('camera', 'stage'))
+DETECTIONS_TOTAL = REGISTRY.counter(
+    'katzenschreck_detections_total',
+    'Accepted detections per class', ('camera', 'class_name'))
+MQTT_PUBLISH_SECONDS = REGISTRY.histogram(
+    'katzenschreck_mqtt_publish_seconds',
+    'Time from publish to delivery (broker acknowledgement for QoS 1/2, sent for QoS 0)')
+MQTT_PUBLISH_FAILURES = REGISTRY.counter(
+    'katzenschreck_mqtt_publish_failures_total', 'MQTT publish attempts that failed')
+DB_INSERT_SECONDS = REGISTRY.histogram(
+    'katzenschreck_db_insert_seconds', 'Time per database insert transaction')
+DB_INSERT_FAILURES = REGISTRY.counter(
+    'katzenschreck_db_insert_failures_total', 'Database insert transactions that failed')
+
+
+class SystemCollector:  # pylint: disable=too-few-public-methods
+    """Exports CPU load, memory usage and SoC temperature from HardwareDetector"""
+
+    def __init__(self, hardware_detector, registry: MetricsRegistry = REGISTRY):
+        self.hardware_detector = hardware_detector
+        self.cpu_load = registry.gauge('katzenschreck_cpu_load',
+                                       '1-minute load average per CPU core')
+        self.memory_used = registry.gauge('katzenschreck_memory_used_ratio',
+                                          'Fraction of system memory in use')
+        self.temperature = registry.gauge('katzenschreck_temperature_celsius',
+                                          'SoC temperature')
+
+    def __call__(self):
+        self.cpu_load.set(self.hardware_detector.get_cpu_load())
+        self.memory_used.set(self.hardware_detector.get_memory_usage())
+        temperature = self.hardware_detector.get_temperature()
+        if temperature is not None:
+            self.temperature.set(temperature)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics"""
+
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answers a scrape"""
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Scrapes every few seconds would flood the log"""
+
+
+class MetricsServer:
+    """HTTP endpoint exposing a registry at http://<host>:<port>/metrics"""
+
+    def __init__(self, port: int = 9100, host: str = '0.0.0.0',
+                 registry: MetricsRegistry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread = None
+
+    def start(self):
+        """Starts serving in a background thread"""
+        if self._server is not None:
+            return
+        handler = type('MetricsRequestHandler', (_MetricsRequestHandler,),
+                       {'registry': self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        # Port 0 picks a free port, useful for local test scrapes
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info("Metrics endpoint listening on http://%s:%d/metrics", self.host, self.port)
+
+    def stop(self):
+        """Stops the HTTP server"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
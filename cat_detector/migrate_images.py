@@ -0,0 +1,113 @@
+"""Moves existing blob_jpeg images from MariaDB into the content-addressed image store
+
+Usage (from the repository root):
+    python -m cat_detector.migrate_images [--config config.txt] [--chunk-size 50]
+
+Without --config, /app/config.txt (Docker) or config.txt in the repository
+root is used, like the application itself.
+
+Rows are processed in id order, chunk by chunk (keyset pagination), so only
+chunk-size images are held in memory at any time. Each chunk is committed on
+its own; an interrupted run simply continues where it stopped.
+"""
+
+import argparse
+import sys
+import os
+
+from mysql.connector import Error, connect
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.config import Config, default_config_path
+from cat_detector.image_store import ImageStore
+
+
+SELECT_CHUNK_SQL = """
+SELECT id, blob_jpeg FROM detections_images
+WHERE id > %s AND blob_jpeg IS NOT NULL AND image_sha256 IS NULL
+ORDER BY id
+LIMIT %s
+"""
+
+UPDATE_SQL = """
+UPDATE detections_images
+SET image_path = %s, image_size = %s, image_sha256 = %s, blob_jpeg = {blob}
+WHERE id = %s
+"""
+
+
+class ImageMigration:  # pylint: disable=too-few-public-methods
+    """Streams blobs out of detections_images in chunks"""
+
+    def __init__(self, config: Config, chunk_size: int = 50,
+                 keep_blobs: bool = False):
+        if not config.image_store_dir:
+            raise ValueError("image_store_dir not found in config.txt")
+        self.config = config
+        self.store = ImageStore(config.image_store_dir)
+        self.chunk_size = chunk_size
+        self.update_sql = UPDATE_SQL.format(blob='blob_jpeg' if keep_blobs else 'NULL')
+
+    def run(self) -> int:
+        """Migrates all remaining rows, returns the number of migrated rows"""
+        connection = connect(host=self.config.db_host,
+                             user=self.config.db_user,
+                             password=self.config.db_password,
+                             database=self.config.db_database)
+        migrated = 0
+        migrated_bytes = 0
+        last_id = 0
+        try:
+            while True:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(SELECT_CHUNK_SQL, (last_id, self.chunk_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+
+                    for row_id, blob in rows:
+                        image_path, image_size, image_sha256 = self.store.put(bytes(blob))
+                        cursor.execute(self.update_sql,
+                                       (image_path, image_size, image_sha256, row_id))
+                        migrated_bytes += image_size
+                        last_id = row_id
+                    connection.commit()
+                finally:
+                    cursor.close()
+
+                migrated += len(rows)
+                print(f"Migrated {migrated} images "
+                      f"({migrated_bytes / (1024 * 1024):.1f} MB), last id {last_id}")
+        finally:
+            connection.close()
+        return migrated
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Move blob_jpeg images from the database into the image store.")
+    parser.add_argument("--config", type=str, default=default_config_path(),
+                        help="Path to config.txt (needs image_store_dir).")
+    parser.add_argument("--chunk-size", type=int, default=50,
+                        help="Number of images per chunk and transaction.")
+    parser.add_argument("--keep-blobs", action='store_true',
+                        help="Keep blob_jpeg after copying (default: set it to NULL).")
+    args = parser.parse_args()
+
+    try:
+        migration = ImageMigration(Config(args.config), args.chunk_size, args.keep_blobs)
+        migrated = migration.run()
+    except (Error, OSError, ValueError) as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+
+    print(f"Done, {migrated} images migrated. Run OPTIMIZE TABLE detections_images "
+          f"to give the freed space back to the file system.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Exported-model inference backends with automatic selection"""
+
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import time
+from typing import List, Optional, Tuple
+
+from .startup import STARTUP
+
+
+logger = logging.getLogger(__name__)
+
+
+# Preference order for automatic selection; PyTorch is always the fallback
+BACKENDS = {
+    'openvino': {'format': 'openvino', 'module': 'openvino'},
+    'onnx': {'format': 'onnx', 'module': 'onnxruntime'},
+    'torchscript': {'format': 'torchscript', 'module': 'torch'},
+    'pytorch': {'format': None, 'module': 'torch'},
+}
+
+# Quantised variants the exporters can produce on CPU
+PRECISION_SUPPORT = {
+    'openvino': ('fp32', 'fp16', 'int8'),
+    'onnx': ('fp32',),
+    'torchscript': ('fp32',),
+    'pytorch': ('fp32',),
+}
+
+
+class ModelBackendSelector:
+    """Exports YOLO weights to CPU-optimised formats and picks the fastest one
+
+    Exported artifacts are cached on disk, keyed by model name, input size,
+    precision and batch mode, so the (slow) export only happens once. With
+    backend 'auto' every available backend is timed on a synthetic frame and
+    the result is stored next to the artifacts, so later starts load the
+    winner directly.
+    """
+
+    def __init__(self, cache_dir: str, imgsz: int = 640,  # pylint: disable=too-many-arguments
+                 precision: str = 'fp32', dynamic_batch: bool = False,
+                 benchmark_runs: int = 5):
+        self.cache_dir = cache_dir
+        self.imgsz = imgsz
+        self.precision = precision.lower()
+        self.dynamic_batch = dynamic_batch
+        self.benchmark_runs = benchmark_runs
+
+    @staticmethod
+    def is_available(backend: str) -> bool:
+        """Checks whether the runtime for a backend is installed"""
+        module = BACKENDS[backend]['module']
+        return importlib.util.find_spec(module) is not None
+
+    def _precision_for(self, backend: str) -> str:
+        """Returns the requested precision, or fp32 if the backend can't do it"""
+        if self.precision in PRECISION_SUPPORT[backend]:
+            return self.precision
+        return 'fp32'
+
+    def _cache_key(self, model_path: str, backend: str) -> str:
+        """Builds the cache key for an exported artifact"""
+        model_name = os.path.splitext(os.path.basename(model_path))[0]
+        batch_mode = 'dynamic' if self.dynamic_batch else 'static'
+        return (f'{model_name}_{self.imgsz}_{self._precision_for(backend)}_'
+                f'{batch_mode}_{backend}')
+
+    def export(self, model_path: str, backend: str) -> str:
+        """Returns the path of the exported model, exporting it if not cached"""
+        if backend == 'pytorch':
+            return model_path
+
+        target = os.path.join(self.cache_dir, self._cache_key(model_path, backend))
+        if os.path.exists(target):
+            return self._artifact_path(target, backend)
+
+        precision = self._precision_for(backend)
+        logger.info("Exporting %s to %s (%s, imgsz %d), this only happens once...",
+                    model_path, backend, precision, self.imgsz)
+        yolo = STARTUP.import_module('ultralytics').YOLO
+        exported = yolo(model_path).export(format=BACKENDS[backend]['format'],
+                                           imgsz=self.imgsz,
+                                           half=precision == 'fp16',
+                                           int8=precision == 'int8',
+                                           dynamic=self.dynamic_batch)
+
+        # Move the artifact into a temporary directory first, then rename it
+        # into place so an interrupted export never leaves a half-written cache
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = f'{target}.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        shutil.move(str(exported), staging)
+        os.replace(staging, target)
+        return self._artifact_path(target, backend)
+
+    @staticmethod
+    def _artifact_path(target: str, backend: str) -> str:
+        """Returns the loadable path inside a cache entry
+
+        Each entry holds exactly one artifact: a file for ONNX/TorchScript, a
+        directory for OpenVINO (YOLO loads the directory itself).
+        """
+        entries = os.listdir(target)
+        if not entries:
+            raise FileNotFoundError(f"Empty {backend} cache entry: {target}")
+        return os.path.join(target, entries[0])
+
+    def _benchmark(self, model_path: str) -> float:
+        """Returns the mean inference time in seconds on a synthetic frame"""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        model = STARTUP.import_module('ultralytics').YOLO(model_path, task='detect')
+        frame = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        model(frame, imgsz=self.imgsz, verbose=False)  # Warm-up
+
+        start = time.perf_counter()
+        for _ in range(self.benchmark_runs):
+            model(frame, imgsz=self.imgsz, verbose=False)
+        return (time.perf_counter() - start) / self.benchmark_runs
+
+    def _selection_file(self, model_path: str) -> str:
+        """Returns the file that stores the automatic selection result"""
+        model_name = os.path.splitext(os.path.basename(model_path))[0]
+        batch_mode = 'dynamic' if self.dynamic_batch else 'static'
+        return os.path.join(self.cache_dir, f'{model_name}_{self.imgsz}_'
+                                            f'{self.precision}_{batch_mode}_auto.json')
+
+    def _load_selection(self, model_path: str) -> Optional[str]:
+        """Loads a previously stored automatic selection"""
+        try:
+            with open(self._selection_file(model_path), 'r', encoding='utf-8') as file:
+                backend = json.load(file).get('backend')
+        except (OSError, ValueError):
+            return None
+        if backend in BACKENDS and self.is_available(backend):
+            return backend
+        return None
+
+    def _store_selection(self, model_path: str, backend: str, timings: dict):
+        """Stores the automatic selection result"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._selection_file(model_path), 'w', encoding='utf-8') as file:
+                json.dump({'backend': backend, 'timings_ms': timings}, file, indent=2)
+        except OSError as e:
+            logger.warning("Could not store backend selection: %s", e)
+
+    def _auto_select(self, model_path: str) -> Tuple[str, str]:
+        """Times every available backend and returns the fastest one"""
+        stored = self._load_selection(model_path)
+        if stored:
+            try:
+                return stored, self.export(model_path, stored)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Stored backend %s unusable (%s), re-benchmarking", stored, e)
+
+        timings = {}
+        paths = {}
+        for backend in self.candidates():
+            try:
+                paths[backend] = self.export(model_path, backend)
+                timings[backend] = self._benchmark(paths[backend]) * 1000
+                logger.info("%s: %.1f ms per frame", backend, timings[backend])
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Exporters fail for all kinds of reasons (missing packages,
+                # unsupported ops); just leave that backend out
+                logger.info("Backend %s not usable: %s", backend, e)
+
+        if not timings:
+            return 'pytorch', model_path
+
+        backend = min(timings, key=timings.get)
+        self._store_selection(model_path, backend, timings)
+        return backend, paths[backend]
+
+    def candidates(self) -> List[str]:
+        """Returns the installed backends in preference order"""
+        return [backend for backend in BACKENDS if self.is_available(backend)]
+
+    def resolve(self, model_path: str, backend: str = 'auto') -> Tuple[str, str]:
+        """Returns (backend, path to load) for the requested backend
+
+        Falls back to the PyTorch weights if the backend is unknown, not
+        installed or the export fails.
+        """
+        backend = backend.lower()
+        if backend == 'auto':
+            return self._auto_select(model_path)
+
+        if backend not in BACKENDS or not self.is_available(backend):
+            logger.warning("Inference backend %s not available, using pytorch", backend)
+            return 'pytorch', model_path
+
+        try:
+            return backend, self.export(model_path, backend)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Export to %s failed (%s), using pytorch", backend, e)
+            return 'pytorch', model_path
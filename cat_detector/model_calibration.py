@@ -0,0 +1,157 @@
+"""Startup calibration: pick the largest YOLO model the hardware can run in time"""
+
+import glob
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from .hardware_detector import HardwareDetector
+from .startup import STARTUP
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCalibrator:  # pylint: disable=too-many-instance-attributes
+    """Times candidate models and input sizes on the real hardware
+
+    Candidates are tried from the largest model and input size downwards; the
+    first one whose mean latency fits the budget (1 / target_fps, or
+    max_latency_ms if that is stricter) wins. If none fits, the fastest one is
+    used. The result is stored in calibration_file keyed by a hardware
+    fingerprint and the calibration settings, so later starts skip the timing.
+    """
+
+    def __init__(self, calibration_file: str,  # pylint: disable=too-many-arguments
+                 models: List[str], imgsz_candidates: List[int],
+                 target_fps: float = 1.0, max_latency_ms: Optional[float] = None,
+                 sample_dir: Optional[str] = None, runs: int = 3,
+                 hardware_detector: Optional[HardwareDetector] = None):
+        self.calibration_file = calibration_file
+        self.models = models
+        self.imgsz_candidates = sorted(imgsz_candidates, reverse=True)
+        self.target_fps = target_fps
+        self.max_latency_ms = max_latency_ms
+        self.sample_dir = sample_dir
+        self.runs = max(1, runs)
+        self.hardware_detector = hardware_detector or HardwareDetector()
+
+    @property
+    def latency_budget_ms(self) -> float:
+        """Returns the per-frame latency budget in milliseconds"""
+        budget = 1000 / self.target_fps if self.target_fps > 0 else float('inf')
+        if self.max_latency_ms:
+            budget = min(budget, self.max_latency_ms)
+        return budget
+
+    def _cache_key(self) -> str:
+        """Builds the key the calibration result is stored under"""
+        return json.dumps({
+            'hardware': self.hardware_detector.get_fingerprint(),
+            'models': self.models,
+            'imgsz': self.imgsz_candidates,
+            'budget_ms': round(self.latency_budget_ms, 1)
+        }, sort_keys=True)
+
+    def _load_cached(self) -> Optional[Tuple[str, int]]:
+        """Returns a stored calibration result for this hardware and settings"""
+        try:
+            with open(self.calibration_file, 'r', encoding='utf-8') as file:
+                entry = json.load(file).get(self._cache_key())
+        except (OSError, ValueError):
+            return None
+        if not entry:
+            return None
+        return entry['model'], int(entry['imgsz'])
+
+    def _store(self, model: str, imgsz: int, timings: dict):
+        """Stores the calibration result, keeping results for other settings"""
+        try:
+            with open(self.calibration_file, 'r', encoding='utf-8') as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            stored = {}
+
+        stored[self._cache_key()] = {
+            'model': model,
+            'imgsz': imgsz,
+            'timings_ms': timings,
+            'calibrated_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        try:
+            directory = os.path.dirname(os.path.abspath(self.calibration_file))
+            os.makedirs(directory, exist_ok=True)
+            temp_file = f'{self.calibration_file}.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(stored, file, indent=2)
+            os.replace(temp_file, self.calibration_file)
+        except OSError as e:
+            logger.warning("Could not store calibration result: %s", e)
+
+    def _load_frames(self, imgsz: int) -> list:
+        """Returns sample frames from sample_dir, or a synthetic frame"""
+        import cv2  # pylint: disable=import-outside-toplevel
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        frames = []
+        if self.sample_dir:
+            for path in sorted(glob.glob(os.path.join(self.sample_dir, '*.jpg')))[:self.runs]:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    frames.append(frame)
+        if not frames:
+            # Noise instead of a black frame, so NMS gets some candidates to chew on
+            rng = np.random.default_rng(0)
+            frames.append(rng.integers(0, 255, (imgsz, imgsz, 3), dtype=np.uint8))
+        return frames
+
+    def _time_candidate(self, model_path: str, imgsz: int) -> float:
+        """Returns the mean latency in milliseconds for one model and input size"""
+        model = STARTUP.import_module('ultralytics').YOLO(model_path)
+        frames = self._load_frames(imgsz)
+        model(frames[0], imgsz=imgsz, verbose=False)  # Warm-up
+
+        start = time.perf_counter()
+        for run in range(self.runs):
+            model(frames[run % len(frames)], imgsz=imgsz, verbose=False)
+        return (time.perf_counter() - start) / self.runs * 1000
+
+    def calibrate(self) -> Tuple[str, int]:
+        """Times the candidates and returns (model, imgsz)"""
+        budget = self.latency_budget_ms
+        logger.info("Calibrating model selection (budget %.0f ms per frame)...", budget)
+
+        timings = {}
+        fastest = None
+        for model_path in self.models:
+            for imgsz in self.imgsz_candidates:
+                try:
+                    latency = self._time_candidate(model_path, imgsz)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logger.info("%s @ %d: failed (%s)", model_path, imgsz, e)
+                    continue
+
+                timings[f'{model_path}@{imgsz}'] = round(latency, 1)
+                logger.info("%s @ %d: %.0f ms", model_path, imgsz, latency)
+                if fastest is None or latency < fastest[2]:
+                    fastest = (model_path, imgsz, latency)
+                if latency <= budget:
+                    self._store(model_path, imgsz, timings)
+                    return model_path, imgsz
+
+        if fastest is None:
+            raise RuntimeError("Model calibration failed for all candidates")
+
+        logger.info("No candidate meets the budget, using the fastest one")
+        self._store(fastest[0], fastest[1], timings)
+        return fastest[0], fastest[1]
+
+    def select(self) -> Tuple[str, int]:
+        """Returns the calibrated (model, imgsz), calibrating only if nothing is stored"""
+        cached = self._load_cached()
+        if cached:
+            logger.info("Using calibrated model %s @ %d", cached[0], cached[1])
+            return cached
+        return self.calibrate()
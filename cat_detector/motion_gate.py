@@ -0,0 +1,127 @@
+"""Motion-gated inference for the cat deterrent system"""
+
+import time
+from collections import deque
+from typing import List, Optional
+import cv2
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.zone_mask import ZoneMask
+
+
+class MotionGate:  # pylint: disable=too-many-instance-attributes,too-many-arguments
+    """Cheap motion pre-filter in front of the YOLO detector
+
+    Frames are downscaled to a small grayscale image and compared against a
+    running-average background. YOLO only runs when enough pixels outside the
+    ignore zones (and inside the include zones) changed. Every force_interval
+    seconds an inference is forced anyway as a safety net; when such a forced
+    inference finds something the gate would have skipped, it is counted as a
+    missed detection.
+    """
+
+    def __init__(self, zone_mask: Optional[ZoneMask] = None,
+                 threshold: int = 25, min_area: float = 0.002,
+                 force_interval: float = 10.0, width: int = 320):
+        self.zone_mask = zone_mask
+        self.threshold = threshold
+        self.min_area = min_area
+        self.force_interval = force_interval
+        self.width = width
+        self.background_rate = 0.05
+
+        self._background = None
+        self._last_inference_time = 0.0
+        self._pending_forced = deque()
+        self.last_regions = []
+
+        # Metrics
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.forced_inferences = 0
+        self.missed_detections = 0
+
+    def _prepare(self, frame):
+        """Downscales the frame to a blurred grayscale image"""
+        height, width = frame.shape[:2]
+        small_height = max(1, int(height * self.width / width))
+        small = cv2.resize(frame, (self.width, small_height),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _mask_ignore_zone(self, mask):
+        """Clears the excluded zones in the motion mask"""
+        if self.zone_mask is None:
+            return
+        cv2.bitwise_and(mask, self.zone_mask.allowed_mask(mask.shape), dst=mask)
+
+    def detect_motion(self, frame) -> List[List[float]]:
+        """Returns the motion regions outside the excluded zones
+
+        Regions are [x_min, y_min, x_max, y_max] as fractions of the frame size.
+        """
+        gray = self._prepare(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype('float32')
+            return []
+
+        background = cv2.convertScaleAbs(self._background)
+        cv2.accumulateWeighted(gray, self._background, self.background_rate)
+
+        diff = cv2.absdiff(gray, background)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        self._mask_ignore_zone(mask)
+
+        height, width = mask.shape[:2]
+        if cv2.countNonZero(mask) < self.min_area * width * height:
+            return []
+
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append([x / width, y / height, (x + w) / width, (y + h) / height])
+        return regions
+
+    def should_infer(self, frame) -> bool:
+        """Decides whether the detector has to run on this frame"""
+        self.frames_checked += 1
+        self.last_regions = self.detect_motion(frame)
+        now = time.monotonic()
+
+        if self.last_regions:
+            forced = False
+        elif now - self._last_inference_time >= self.force_interval:
+            forced = True
+            self.forced_inferences += 1
+        else:
+            self.frames_skipped += 1
+            return False
+
+        self._last_inference_time = now
+        self._pending_forced.append(forced)
+        return True
+
+    def record_result(self, detections):
+        """Records the accepted detections of the oldest frame let through"""
+        forced = self._pending_forced.popleft() if self._pending_forced else False
+        if detections and forced:
+            self.missed_detections += 1
+
+    def get_stats(self) -> dict:
+        """Returns skip ratio and missed detection counters"""
+        return {
+            'frames_checked': self.frames_checked,
+            'frames_skipped': self.frames_skipped,
+            'skip_ratio': (self.frames_skipped / self.frames_checked
+                           if self.frames_checked else 0.0),
+            'forced_inferences': self.forced_inferences,
+            'missed_detections': self.missed_detections
+        }
@@ -1,8 +1,11 @@
 """MQTT communication handler for the cat deterrent system"""
 
+import logging
 import time
 import json
 import threading
+from collections import deque
+from typing import Optional
 import paho.mqtt.client as mqtt
 import sys
 import os
@@ -11,16 +14,143 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cat_detector.config import Config
+from cat_detector.metrics import (REGISTRY, MQTT_PUBLISH_FAILURES,
+                                  MQTT_PUBLISH_SECONDS)
 
 
-class MQTTHandler:  # pylint: disable=too-few-public-methods
-    """MQTT handler for communication with MQTT broker"""
+logger = logging.getLogger(__name__)
+
+
+class MQTTHandler:  # pylint: disable=too-many-instance-attributes
+    """MQTT handler with one long-lived connection to the MQTT broker
+
+    The client keeps its connection open and runs paho's network thread
+    (loop_start), which reconnects with exponential backoff. Messages published
+    while the broker is unreachable go into a bounded offline queue (oldest
+    messages are dropped first) and are delivered once the connection is back.
+    A QoS 1/2 message that paho rejects with MQTT_ERR_NO_CONN (the connection
+    dropped just before) is already in paho's own queue and is resent by paho,
+    so it is not queued a second time.
+    """
 
     def __init__(self, config: Config):
         self.config = config
         self.ping_thread = None
+        self.connected = False
+        self._lock = threading.Lock()
+        self._offline_queue = deque(maxlen=config.mqtt_offline_queue_size)
+        # Message id -> publish start, until on_publish reports delivery.
+        # Reentrant: paho may call on_publish from within publish()
+        self._in_flight = {}
+        self._in_flight_lock = threading.RLock()
+
+        # Counters
+        self.messages_published = 0
+        self.messages_queued = 0
+        self.messages_dropped = 0
+
+        self._queue_depth_gauge = REGISTRY.gauge(
+            'katzenschreck_mqtt_offline_queue_depth',
+            'Messages waiting for the broker to become reachable')
+        REGISTRY.add_collector(self._collect_metrics)
+
+        self.client = self._create_client()
+        self._connect()
         self._start_ping_thread()
 
+    def _create_client(self):
+        """Creates the paho client (compatible with paho-mqtt 1.x and 2.x)"""
+        if hasattr(mqtt, 'CallbackAPIVersion'):
+            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1)
+        else:
+            client = mqtt.Client()
+        client.username_pw_set(self.config.mqtt_username,
+                               self.config.mqtt_password)
+        client.reconnect_delay_set(min_delay=self.config.mqtt_reconnect_min_delay,
+                                   max_delay=self.config.mqtt_reconnect_max_delay)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_publish = self._on_publish
+        return client
+
+    def _connect(self):
+        """Starts the network thread, which connects and reconnects in the background"""
+        try:
+            self.client.connect_async(self.config.mqtt_broker_url,
+                                      self.config.mqtt_broker_port, 60)
+        except (ValueError, OSError) as e:
+            logger.error("MQTT Connect Error: %s", e)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, rc):  # pylint: disable=unused-argument
+        """Marks the client connected and delivers queued messages"""
+        if rc != 0:
+            logger.error("MQTT connection refused (rc=%s)", rc)
+            return
+        logger.info("MQTT connection established.")
+        with self._lock:
+            self.connected = True
+        self._flush_offline_queue()
+
+    def _on_disconnect(self, client, userdata, rc):  # pylint: disable=unused-argument
+        """Marks the client disconnected; paho reconnects on its own"""
+        with self._lock:
+            self.connected = False
+        if rc != 0:
+            logger.warning("MQTT connection lost (rc=%s), reconnecting...", rc)
+
+    def _on_publish(self, client, userdata, mid):  # pylint: disable=unused-argument
+        """Records the delivery time: broker acknowledgement for QoS 1/2, sent for QoS 0"""
+        with self._in_flight_lock:
+            start = self._in_flight.pop(mid, None)
+        if start is not None:
+            MQTT_PUBLISH_SECONDS.observe(time.perf_counter() - start)
+
+    def _enqueue(self, topic: str, payload: str):
+        """Stores a message until the broker is reachable again"""
+        with self._lock:
+            if len(self._offline_queue) == self._offline_queue.maxlen:
+                self.messages_dropped += 1
+            self._offline_queue.append((topic, payload))
+            self.messages_queued += 1
+
+    def _flush_offline_queue(self):
+        """Publishes queued messages in their original order"""
+        while True:
+            with self._lock:
+                if not self._offline_queue or not self.connected:
+                    return
+                topic, payload = self._offline_queue.popleft()
+            if not self._publish(topic, payload):
+                # Put it back in front and wait for the next reconnect
+                with self._lock:
+                    self._offline_queue.appendleft((topic, payload))
+                return
+
+    def _publish(self, topic: str, payload: str) -> bool:
+        """Publishes on the persistent connection, returns False if it failed"""
+        start = time.perf_counter()
+        with self._in_flight_lock:
+            try:
+                info = self.client.publish(topic, payload, qos=self.config.mqtt_qos)
+            except (ValueError, OSError) as e:
+                logger.error("MQTT Publish Error: %s", e)
+                MQTT_PUBLISH_FAILURES.inc()
+                return False
+            queued_by_paho = (info.rc == mqtt.MQTT_ERR_NO_CONN and self.config.mqtt_qos > 0)
+            if info.rc == mqtt.MQTT_ERR_SUCCESS or queued_by_paho:
+                self._in_flight[info.mid] = start
+        if queued_by_paho:
+            # The connection dropped before on_disconnect ran; paho resends it
+            with self._lock:
+                self.messages_queued += 1
+            return True
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            MQTT_PUBLISH_FAILURES.inc()
+            return False
+        self.messages_published += 1
+        return True
+
     def _start_ping_thread(self):
         """Starts the MQTT ping thread"""
         self.ping_thread = threading.Thread(target=self._mqtt_ping)
@@ -31,39 +161,86 @@ class MQTTHandler:  # pylint: disable=too-few-public-methods
         """Sends a ping to the MQTT broker every 30 seconds"""
         while True:
             time.sleep(30)
-            client = mqtt.Client()
-            client.username_pw_set(self.config.mqtt_username,
-                                  self.config.mqtt_password)
-            try:
-                client.connect(self.config.mqtt_broker_url,
-                              self.config.mqtt_broker_port, 60)
-                client.loop_start()
-                extended_topic = f'{self.config.mqtt_topic}/ping'
-                current_timestamp = int(time.time())
-                client.publish(extended_topic,
-                              json.dumps({"timestamp": current_timestamp}))
-                client.loop_stop()
-                client.disconnect()
-            except (mqtt.MQTTException, ConnectionError, OSError) as e:
-                print(f"MQTT Ping Error: {e}")
-
-    def publish_detection(self, class_name: str, confidence: float,
-                         timestamp: str):
-        """Sends a detection message to the MQTT broker"""
-        client = mqtt.Client()
-        client.username_pw_set(self.config.mqtt_username,
-                              self.config.mqtt_password)
+            # A ping is only meaningful now, so it is never queued
+            if not self.connected:
+                continue
+            extended_topic = f'{self.config.mqtt_topic}/ping'
+            current_timestamp = int(time.time())
+            self._publish(extended_topic,
+                          json.dumps({"timestamp": current_timestamp}))
 
-        try:
-            client.connect(self.config.mqtt_broker_url,
-                          self.config.mqtt_broker_port, 60)
-            extended_topic = f'{self.config.mqtt_topic}/{class_name}'
-            message = json.dumps({
-                "time": timestamp,
-                "class": class_name,
-                "confidence": confidence
-            })
-            client.publish(extended_topic, message)
-            client.disconnect()
-        except (mqtt.MQTTException, ConnectionError, OSError) as e:
-            print(f"MQTT Publish Error: {e}")
+    def _send(self, topic: str, message: str):
+        """Publishes a message, or queues it while the broker is unreachable"""
+        with self._lock:
+            has_backlog = bool(self._offline_queue)
+        if self.connected and not has_backlog and self._publish(topic, message):
+            return
+
+        # Keep the original order: older queued messages go out first
+        self._enqueue(topic, message)
+        if self.connected:
+            self._flush_offline_queue()
+        else:
+            logger.warning("MQTT broker not reachable, message queued")
+
+    def publish_detection(self, class_name: str, confidence: float,  # pylint: disable=too-many-arguments
+                         timestamp: str, topic: Optional[str] = None,
+                         event_id: Optional[int] = None):
+        """Sends a detection message to the MQTT broker
+
+        topic overrides the configured base topic, so cameras in multi-camera
+        mode can share one connection. event_id marks the start of a visit
+        event when event tracking is enabled.
+        """
+        extended_topic = f'{topic or self.config.mqtt_topic}/{class_name}'
+        payload = {
+            "time": timestamp,
+            "class": class_name,
+            "confidence": confidence
+        }
+        if event_id is not None:
+            payload["event"] = "start"
+            payload["event_id"] = event_id
+        self._send(extended_topic, json.dumps(payload))
+
+    def publish_event_end(self, class_name: str, event_id: int,  # pylint: disable=too-many-arguments
+                          summary: dict, timestamp: str, topic: Optional[str] = None):
+        """Sends the end of a visit event to <topic>/<class>/end"""
+        extended_topic = f'{topic or self.config.mqtt_topic}/{class_name}/end'
+        payload = {
+            "time": timestamp,
+            "class": class_name,
+            "event": "end",
+            "event_id": event_id
+        }
+        payload.update(summary)
+        self._send(extended_topic, json.dumps(payload))
+
+    def get_stats(self) -> dict:
+        """Returns connection state and message counters"""
+        with self._lock:
+            return {
+                'connected': self.connected,
+                'messages_published': self.messages_published,
+                'messages_queued': self.messages_queued,
+                'messages_dropped': self.messages_dropped,
+                'queue_depth': len(self._offline_queue)
+            }
+
+    def _collect_metrics(self):
+        """Refreshes the offline queue gauge before a metrics scrape"""
+        with self._lock:
+            self._queue_depth_gauge.set(len(self._offline_queue))
+
+    def close(self, timeout: float = 2.0):
+        """Waits up to timeout for in-flight messages, then disconnects"""
+        deadline = time.monotonic() + timeout
+        while self.connected and time.monotonic() < deadline:
+            with self._in_flight_lock:
+                if not self._in_flight:
+                    break
+            time.sleep(0.05)
+        REGISTRY.remove_collector(self._collect_metrics)
+        # Disconnect first, so the network thread still sends the DISCONNECT packet
+        self.client.disconnect()
+        self.client.loop_stop()
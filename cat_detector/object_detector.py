@@ -1,73 +1,248 @@
 """Object detection using YOLO for cat detection"""
 
+import logging
+import os
 from typing import Optional, List, Tuple
-from ultralytics import YOLO
+import cv2
+import numpy as np
 from .hardware_detector import HardwareDetector
+from .model_backends import ModelBackendSelector
+from .model_calibration import ModelCalibrator
+from .startup import STARTUP
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       'model_cache')
+
+
+class Detections:
+    """Detections of one frame as parallel class ID, confidence and xyxy box arrays
+
+    Filters work on the arrays directly; iterating yields the usual
+    (class_id, confidence, [x1, y1, x2, y2]) tuples, so Python objects are
+    only built for the detections that are actually used.
+    """
+
+    __slots__ = ('class_ids', 'confidences', 'boxes')
+
+    def __init__(self, class_ids: np.ndarray, confidences: np.ndarray, boxes: np.ndarray):
+        self.class_ids = class_ids
+        self.confidences = confidences
+        self.boxes = boxes
+
+    @classmethod
+    def empty(cls) -> 'Detections':
+        """Returns detections without any box"""
+        return cls(np.zeros(0, dtype=int), np.zeros(0, dtype=np.float32),
+                   np.zeros((0, 4), dtype=np.float32))
+
+    @classmethod
+    def concatenate(cls, parts: List['Detections']) -> 'Detections':
+        """Joins the detections of several results or crops"""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(np.concatenate([part.class_ids for part in parts]),
+                   np.concatenate([part.confidences for part in parts]),
+                   np.concatenate([part.boxes for part in parts]))
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
+    def __iter__(self):
+        return zip(self.class_ids.tolist(), self.confidences.tolist(), self.boxes.tolist())
+
+    def select(self, mask: np.ndarray) -> List[Tuple[int, float, List[float]]]:
+        """Returns the detections where mask is True as tuples"""
+        return list(Detections(self.class_ids[mask], self.confidences[mask],
+                               self.boxes[mask]))
+
+    def transformed(self, scale: Tuple[float, float] = (1.0, 1.0),
+                    offset: Tuple[float, float] = (0.0, 0.0)) -> 'Detections':
+        """Returns the detections with boxes scaled, then shifted by offset"""
+        factors = np.array([scale[0], scale[1], scale[0], scale[1]])
+        shift = np.array([offset[0], offset[1], offset[0], offset[1]])
+        return Detections(self.class_ids, self.confidences, self.boxes * factors + shift)
 
 
 class ObjectDetector:
     """YOLO object detection class with automatic hardware detection"""
 
+    # Display names (also used in MQTT topics); other classes use the model's names
     CLASS_NAMES = {0: 'Person', 15: 'Cat'}
-    TARGET_CLASS_ID = 15  # Cat
+    DEFAULT_TARGET_CLASSES = ['cat']
+
+    def __init__(self, model_path: Optional[str] = None,  # pylint: disable=too-many-arguments
+                 hardware_type: Optional[str] = None, max_batch_size: int = 1,
+                 backend: str = 'pytorch', imgsz: int = 640, precision: str = 'fp32',
+                 cache_dir: Optional[str] = None,
+                 calibrator: Optional[ModelCalibrator] = None,
+                 target_classes: Optional[List[str]] = None,
+                 min_confidence: Optional[float] = None):
+        # Benchmark-driven model selection if a calibrator is given
+        if model_path is None and calibrator is not None:
+            try:
+                model_path, imgsz = calibrator.select()
+                logger.info("Calibrated model: %s (imgsz %d)", model_path, imgsz)
+            except RuntimeError as e:
+                logger.warning("Model calibration failed (%s), using hardware heuristics", e)
 
-    def __init__(self, model_path: Optional[str] = None, hardware_type: Optional[str] = None):
         # Auto-detect optimal model if not specified
         if model_path is None:
             hardware_detector = HardwareDetector(forced_type=hardware_type)
             model_path, requirements_file = hardware_detector.get_optimal_model()
-            print(f"🤖 Auto-detected optimal model: {model_path}")
-            print(f"📋 Using requirements: {requirements_file}")
+            logger.info("Auto-detected optimal model: %s", model_path)
+            logger.info("Using requirements: %s", requirements_file)
         
-        self.model = YOLO(model_path)
-
-    def detect_objects(self, frame) -> Tuple[List[Tuple[int, float, List[float]]],
-                                            object]:
+        self.model_path = model_path
+        self.max_batch_size = max(1, max_batch_size)
+        self.imgsz = imgsz
+
+        # Exported backends are loaded through YOLO as well (AutoBackend)
+        selector = ModelBackendSelector(cache_dir or DEFAULT_MODEL_CACHE_DIR,
+                                        imgsz=imgsz, precision=precision,
+                                        dynamic_batch=self.max_batch_size > 1)
+        self.backend, weights_path = selector.resolve(model_path, backend)
+        logger.info("Inference backend: %s (%s)", self.backend, weights_path)
+        # Imported here: torch/ultralytics take seconds to import on a Pi
+        yolo = STARTUP.import_module('ultralytics').YOLO
+        self.model = yolo(weights_path, task='detect')
+
+        # Only the target classes are decoded and go through NMS
+        self.model_names = dict(self.model.names)
+        self.target_class_ids = [self.resolve_class(name) for name
+                                 in target_classes or self.DEFAULT_TARGET_CLASSES]
+        self._target_array = np.array(self.target_class_ids)
+        # verbose=False: ultralytics would print two lines per inference to
+        # stdout, bypassing the application's logging setup
+        self._predict_args = {'imgsz': imgsz, 'classes': self.target_class_ids,
+                              'verbose': False}
+        if min_confidence is not None:
+            # Boxes below the lowest per-class threshold are dropped before NMS
+            self._predict_args['conf'] = min_confidence
+        class_names = ', '.join(self.class_name(class_id) for class_id in self.target_class_ids)
+        logger.info("Target classes: %s", class_names)
+
+    @classmethod
+    def from_config(cls, config) -> 'ObjectDetector':
+        """Creates a detector from the application configuration"""
+        cache_dir = config.model_cache_dir or DEFAULT_MODEL_CACHE_DIR
+        calibrator = None
+        if config.model_calibration_enabled:
+            calibrator = ModelCalibrator(
+                os.path.join(cache_dir, 'calibration.json'),
+                models=config.calibration_models,
+                imgsz_candidates=config.calibration_imgsz,
+                target_fps=config.calibration_target_fps,
+                max_latency_ms=config.calibration_max_latency_ms,
+                sample_dir=config.calibration_sample_dir,
+                hardware_detector=HardwareDetector(forced_type=config.hardware_type))
+
+        return cls(model_path=config.model_path,
+                   hardware_type=config.hardware_type,
+                   max_batch_size=config.inference_batch_size,
+                   backend=config.inference_backend,
+                   imgsz=config.inference_imgsz,
+                   precision=config.inference_precision,
+                   cache_dir=cache_dir,
+                   calibrator=calibrator,
+                   target_classes=config.target_classes,
+                   min_confidence=config.min_confidence())
+
+    def warm_up(self) -> 'ObjectDetector':
+        """Runs one inference on a blank frame, so the first real frame is not slow"""
+        frame = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        self.model(frame, **self._predict_args)
+        return self
+
+    def resolve_class(self, name) -> int:
+        """Returns the class ID for a COCO class name (e.g. 'cat') or a numeric ID"""
+        name = str(name).strip().lower()
+        if name.isdigit():
+            return int(name)
+        for class_id, model_name in self.model_names.items():
+            if model_name.lower() == name:
+                return class_id
+        raise ValueError(f"Unknown class: {name}")
+
+    def class_name(self, class_id: int) -> str:
+        """Returns the display name of a class ID"""
+        if class_id in self.CLASS_NAMES:
+            return self.CLASS_NAMES[class_id]
+        return self.model_names.get(class_id, "Unknown").title()
+
+    def _extract_detections(self, result) -> Detections:
+        """Extracts the relevant detections from a single YOLO result
+
+        Works on the whole boxes tensor at once: one device-to-host copy per
+        field and one class mask instead of per-box .item() calls.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return Detections.empty()
+
+        class_ids = boxes.cls.cpu().numpy().astype(int)
+        # Inference already ran with classes=, this only guards other callers
+        keep = np.isin(class_ids, self._target_array)
+        if not keep.any():
+            return Detections.empty()
+
+        return Detections(class_ids[keep], boxes.conf.cpu().numpy()[keep],
+                          boxes.xyxy.cpu().numpy()[keep])  # [x1, y1, x2, y2]
+
+    def detect_objects(self, frame) -> Tuple[Detections, object]:
         """Detects objects in frame and returns relevant detections"""
-        results = self.model(frame)
-        detections = []
-
-        for result in results:
-            for box in result.boxes:
-                class_id = int(box.cls.item())
-
-                # Only detect cats (not persons)
-                if class_id == self.TARGET_CLASS_ID and class_id != 0:
-                    confidence = box.conf.item()
-                    bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                    detections.append((class_id, confidence, bbox))
-
+        results = self.model(frame, **self._predict_args)
+        detections = Detections.concatenate([self._extract_detections(result)
+                                             for result in results])
         return detections, results
 
-    def is_in_ignore_zone(self, bbox: List[float], frame_shape: Tuple[int, int],
-                          ignore_zone: Optional[List[float]]) -> bool:
-        """Checks if the bounding box is in the ignore zone"""
-        if not ignore_zone:
-            return False
-
-        x1, y1, x2, y2 = bbox
-        frame_h, frame_w = frame_shape[:2]
-
-        # Box coordinates as percentage values
-        box_coords = self._get_box_percentage_coords(x1, y1, x2, y2, frame_w, frame_h)
-
-        # Ignore zone coordinates
-        iz_xmin, iz_ymin, iz_xmax, iz_ymax = ignore_zone
-
-        # Check if box overlaps with ignore zone
-        return self._check_box_overlap(box_coords, (iz_xmin, iz_ymin, iz_xmax, iz_ymax))
-
-    def _get_box_percentage_coords(self, x1, y1, x2, y2, frame_w, frame_h):
-        """Convert box coordinates to percentage values"""
-        return {
-            'xmin': x1 / frame_w,
-            'ymin': y1 / frame_h,
-            'xmax': x2 / frame_w,
-            'ymax': y2 / frame_h
-        }
-
-    def _check_box_overlap(self, box_coords, ignore_zone):
-        """Check if box overlaps with ignore zone"""
-        iz_xmin, iz_ymin, iz_xmax, iz_ymax = ignore_zone
-        return not (box_coords['xmax'] < iz_xmin or box_coords['xmin'] > iz_xmax or
-                   box_coords['ymax'] < iz_ymin or box_coords['ymin'] > iz_ymax)
+    def detect_batch(self, frames: List) -> List[Tuple[Detections, object]]:
+        """Detects objects in several frames with batched forward passes
+
+        Frames are split into chunks of at most max_batch_size. Returns one
+        (detections, results) tuple per frame, in the same format as
+        detect_objects.
+        """
+        outputs = []
+        for start in range(0, len(frames), self.max_batch_size):
+            chunk = frames[start:start + self.max_batch_size]
+            results = self.model(chunk, **self._predict_args)
+            for result in results:
+                outputs.append((self._extract_detections(result), [result]))
+        return outputs
+
+    def detect_regions(self, frame, crops: List[List[int]]) -> Detections:
+        """Detects objects in crops of the frame and returns boxes in frame coordinates
+
+        All crops go through detect_batch, so they share batched forward passes.
+        """
+        images = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in crops]
+        return Detections.concatenate(
+            [crop_detections.transformed(offset=(x1, y1))
+             for (x1, y1, _, _), (crop_detections, _) in zip(crops, self.detect_batch(images))])
+
+    def annotate_frame(self, frame, detections: List[Tuple[int, float, List[float]]],
+                       out: Optional[np.ndarray] = None):
+        """Returns the frame with the given detections drawn on it
+
+        The original frame is left untouched; the drawing goes into out
+        (a reusable buffer of the frame's shape) or into a new copy.
+        """
+        if out is None:
+            annotated_frame = frame.copy()
+        else:
+            np.copyto(out, frame)
+            annotated_frame = out
+        for class_id, confidence, bbox in detections:
+            x1, y1, x2, y2 = (int(value) for value in bbox)
+            label = f'{self.class_name(class_id)} {confidence:.2f}'
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            cv2.putText(annotated_frame, label, (x1, max(y1 - 5, 15)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        return annotated_frame
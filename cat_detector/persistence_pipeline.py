@@ -0,0 +1,146 @@
+"""Background persistence of detections (annotation, JPEG encoding, disk and DB writes)"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+DROP_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+
+class DetectionEvent:  # pylint: disable=too-few-public-methods
+    """A detection (or hourly snapshot) waiting to be persisted
+
+    detections are the accepted detections only; they are drawn on the
+    frame by the persistence worker.
+    """
+
+    def __init__(self, frame, detections=None,
+                 confidence: float = 0.0, timestamp: str = ''):
+        self.frame = frame
+        self.detections = detections or []
+        self.confidence = confidence
+        self.timestamp = timestamp
+        self.created_at = time.monotonic()
+
+
+class PersistencePipeline:  # pylint: disable=too-many-instance-attributes
+    """Bounded worker pool that runs the slow persistence steps off the frame loop
+
+    Events go into a bounded queue. When it is full the drop policy decides:
+    'drop_oldest' evicts the oldest waiting event, 'drop_newest' rejects the
+    new one and 'block' applies backpressure to the frame loop for at most
+    block_timeout seconds before dropping the new event.
+    """
+
+    def __init__(self, handler: Callable[[DetectionEvent], None],  # pylint: disable=too-many-arguments
+                 workers: int = 1, queue_size: int = 16,
+                 drop_policy: str = 'drop_oldest', block_timeout: float = 1.0):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+
+        self.handler = handler
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._workers = []
+
+        # Metrics
+        self.events_submitted = 0
+        self.events_processed = 0
+        self.events_dropped = 0
+        self.events_failed = 0
+        self.max_queue_depth = 0
+        self.last_queue_wait = 0.0
+
+        for index in range(max(1, workers)):
+            worker = threading.Thread(target=self._worker_loop,
+                                      name=f'persistence-{index}')
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, event: DetectionEvent) -> bool:
+        """Queues an event, returns False if it was dropped"""
+        with self._lock:
+            self.events_submitted += 1
+
+        try:
+            if self.drop_policy == 'block':
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            if self.drop_policy != 'drop_oldest':
+                self._count_drop()
+                return False
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count_drop()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._count_drop()
+                return False
+
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def _count_drop(self):
+        """Counts a dropped event"""
+        with self._lock:
+            self.events_dropped += 1
+        logger.warning("Persistence queue full, dropping detection event")
+
+    def _worker_loop(self):
+        """Processes queued events until a stop marker arrives"""
+        while True:
+            event = self._queue.get()
+            try:
+                if event is None:
+                    return
+                self.last_queue_wait = time.monotonic() - event.created_at
+                self.handler(event)
+                with self._lock:
+                    self.events_processed += 1
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # A failing write must never kill the worker
+                with self._lock:
+                    self.events_failed += 1
+                logger.exception("Error persisting detection: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def get_stats(self) -> dict:
+        """Returns queue depth and event counters"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'events_submitted': self.events_submitted,
+                'events_processed': self.events_processed,
+                'events_dropped': self.events_dropped,
+                'events_failed': self.events_failed,
+                'last_queue_wait_ms': self.last_queue_wait * 1000
+            }
+
+    def stop(self, timeout: float = 10.0):
+        """Lets the workers finish the queued events, then stops them"""
+        for _ in self._workers:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
@@ -0,0 +1,216 @@
+"""On-demand profiling windows with per-stage timing, cProfile and tracemalloc reports"""
+
+import cProfile
+import io
+import logging
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+from typing import Optional
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.metrics import STAGE_SECONDS, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:  # pylint: disable=too-many-instance-attributes
+    """Runs profiling windows and writes a summary report for each
+
+    A window starts every interval seconds (0 = only on request) or when
+    the process receives SIGUSR1, and lasts window seconds. Per-stage
+    timings are the difference of the stage histograms between the start
+    and the end of the window; they are recorded all the time anyway, so
+    they also cover the capture and persistence threads. During the window
+    the processing loop can additionally run under cProfile and allocations
+    can be traced with tracemalloc, both of which are too expensive to keep
+    on permanently. Reports are plain text files in output_dir; nothing has
+    to be restarted.
+    """
+
+    def __init__(self, output_dir: str, window: float = 30.0,  # pylint: disable=too-many-arguments
+                 interval: float = 0.0, cpu_profile: bool = True,
+                 memory_profile: bool = False, top: int = 25,
+                 histogram: Histogram = STAGE_SECONDS):
+        self.output_dir = output_dir
+        self.window = window
+        self.interval = interval
+        self.cpu_profile = cpu_profile
+        self.memory_profile = memory_profile
+        self.top = top
+        self.histogram = histogram
+
+        self._requested = threading.Event()
+        self._next_window = time.monotonic() if interval > 0 else float('inf')
+        self._window_start = None
+        self._window_started_at = 0.0
+        self._stages_before = {}
+        self._cpu_profiler = None
+        self._memory_before = None
+        self._stop_tracing = False
+        self.reports_written = 0
+
+    @classmethod
+    def from_config(cls, config, output_dir: str) -> 'Profiler':
+        """Creates a profiler from the application configuration"""
+        return cls(config.profiling_dir or os.path.join(output_dir, 'profiles'),
+                   window=config.profiling_window,
+                   interval=config.profiling_interval if config.profiling_enabled else 0.0,
+                   cpu_profile=config.profiling_cpu,
+                   memory_profile=config.profiling_memory)
+
+    @property
+    def active(self) -> bool:
+        """True while a profiling window is running"""
+        return self._window_start is not None
+
+    def install_signal_handler(self, signum: Optional[int] = None) -> bool:
+        """Starts a window when the process receives SIGUSR1 (call from the main thread)"""
+        if signum is None:
+            signum = getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            return False
+        signal.signal(signum, lambda *_: self.request_window())
+        return True
+
+    def request_window(self):
+        """Asks for a window to start at the next tick (safe from signal handlers)"""
+        self._requested.set()
+
+    def tick(self, now: Optional[float] = None):
+        """Starts or finishes a window; call regularly from the processing loop"""
+        now = time.monotonic() if now is None else now
+        if self._window_start is None:
+            if self._requested.is_set() or now >= self._next_window:
+                self._requested.clear()
+                self._start_window(now)
+        elif now - self._window_start >= self.window:
+            self._finish_window(now)
+
+    def stop(self):
+        """Finishes a running window, so its report is not lost on shutdown"""
+        if self._window_start is not None:
+            self._finish_window(time.monotonic())
+
+    def _start_window(self, now: float):
+        """Snapshots the stage histograms and starts the optional profilers"""
+        self._window_start = now
+        self._window_started_at = time.time()
+        self._stages_before = self.histogram.snapshot()
+
+        if self.cpu_profile:
+            self._cpu_profiler = cProfile.Profile()
+            try:
+                self._cpu_profiler.enable()
+            except ValueError as e:
+                # Another profiler (e.g. a debugger) is already attached
+                logger.warning("cProfile not available: %s", e)
+                self._cpu_profiler = None
+
+        if self.memory_profile:
+            self._stop_tracing = not tracemalloc.is_tracing()
+            if self._stop_tracing:
+                tracemalloc.start()
+            self._memory_before = tracemalloc.take_snapshot()
+
+        logger.info("Profiling window started (%.0f s)", self.window)
+
+    def _finish_window(self, now: float) -> Optional[str]:
+        """Stops the profilers and writes the report, returns its path"""
+        duration = now - self._window_start
+        started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._window_started_at))
+        sections = [f"Profiling window {started}, {duration:.1f} s",
+                    self._stage_section(duration)]
+
+        if self._cpu_profiler is not None:
+            self._cpu_profiler.disable()
+
+        # Snapshot memory before the report itself allocates anything
+        memory_section = None
+        if self._memory_before is not None:
+            memory_section = self._memory_section()
+            self._memory_before = None
+            if self._stop_tracing:
+                tracemalloc.stop()
+
+        if self._cpu_profiler is not None:
+            sections.append(self._cpu_section())
+            self._cpu_profiler = None
+        if memory_section:
+            sections.append(memory_section)
+
+        self._window_start = None
+        if self.interval > 0:
+            self._next_window = now + self.interval
+
+        filename = time.strftime('profile_%Y%m%d_%H%M%S.txt',
+                                 time.localtime(self._window_started_at))
+        path = os.path.join(self.output_dir, filename)
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('\n\n'.join(sections) + '\n')
+        except OSError as e:
+            logger.error("Could not write profiling report: %s", e)
+            return None
+        self.reports_written += 1
+        logger.info("Profiling report written to %s", path)
+        return path
+
+    def _percentile_bound(self, counts: list, fraction: float) -> str:
+        """Returns the bucket bound below which fraction of the observations fall"""
+        target = sum(counts) * fraction
+        cumulative = 0
+        for bound, count in zip(self.histogram.buckets, counts):
+            cumulative += count
+            if cumulative >= target:
+                return f'<={bound * 1000:.0f}'
+        return f'>{self.histogram.buckets[-1] * 1000:.0f}'
+
+    def _stage_section(self, duration: float) -> str:
+        """Per-stage calls, total and mean time within the window"""
+        rows = []
+        for key, (counts, total) in self.histogram.snapshot().items():
+            before_counts, before_total = self._stages_before.get(
+                key, ([0] * len(counts), 0.0))
+            delta = [after - before for after, before in zip(counts, before_counts)]
+            calls = sum(delta)
+            if calls:
+                rows.append((total - before_total, calls, ' / '.join(key), delta))
+
+        lines = ["Stage timings (nested stages are included in their parents; "
+                 "share is of the window's wall time)",
+                 f"{'stage':<32} {'calls':>8} {'total s':>9} {'mean ms':>9} "
+                 f"{'p95 ms':>8} {'share':>7}"]
+        for total, calls, name, delta in sorted(rows, reverse=True):
+            lines.append(f"{name:<32} {calls:>8} {total:>9.2f} "
+                         f"{total / calls * 1000:>9.1f} "
+                         f"{self._percentile_bound(delta, 0.95):>8} "
+                         f"{total / duration if duration > 0 else 0.0:>7.1%}")
+        if not rows:
+            lines.append("(no stage was timed)")
+        return '\n'.join(lines)
+
+    def _cpu_section(self) -> str:
+        """Top functions of the processing loop by cumulative time"""
+        output = io.StringIO()
+        stats = pstats.Stats(self._cpu_profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        return "CPU profile of the processing loop\n" + output.getvalue().strip()
+
+    def _memory_section(self) -> str:
+        """Source lines with the largest allocation growth during the window"""
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        lines = [f"Memory (tracemalloc): {current / 1024 / 1024:.1f} MB current, "
+                 f"{peak / 1024 / 1024:.1f} MB peak, top allocation growth:"]
+        for stat in after.compare_to(self._memory_before, 'lineno')[:self.top]:
+            lines.append(str(stat))
+        return '\n'.join(lines)
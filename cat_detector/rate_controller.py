@@ -0,0 +1,125 @@
+"""Adaptive processing rate driven by activity and the thermal/CPU budget"""
+
+import logging
+import time
+from typing import Optional
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.hardware_detector import HardwareDetector
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateController:  # pylint: disable=too-many-instance-attributes
+    """Decides when the next frame should be processed
+
+    Frames are processed at idle_fps while nothing happens and at active_fps
+    for active_hold seconds after motion or a detection. Every check_interval
+    seconds the SoC temperature and CPU load are read; above temp_limit or
+    load_limit the interval is doubled (up to max_backoff times), and halved
+    again once both are comfortably below their limits (5 degrees / 80%).
+    The frame grabber keeps draining the stream in between, so the frame
+    processed after a pause is always the newest one.
+    """
+
+    def __init__(self, idle_fps: float = 1.0, active_fps: float = 5.0,  # pylint: disable=too-many-arguments
+                 active_hold: float = 30.0, temp_limit: float = 75.0,
+                 load_limit: float = 0.9, check_interval: float = 5.0,
+                 max_backoff: int = 8,
+                 hardware_detector: Optional[HardwareDetector] = None):
+        self.idle_interval = 1.0 / idle_fps
+        self.active_interval = 1.0 / max(active_fps, idle_fps)
+        self.active_hold = active_hold
+        self.temp_limit = temp_limit
+        self.load_limit = load_limit
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.hardware_detector = hardware_detector
+
+        self.backoff = 1
+        self._last_activity = float('-inf')
+        self._last_frame = float('-inf')
+        self._last_check = float('-inf')
+
+        # Last readings, for the stats output
+        self.temperature = None
+        self.cpu_load = 0.0
+
+    @classmethod
+    def from_config(cls, config,
+                    hardware_detector: Optional[HardwareDetector] = None
+                    ) -> 'AdaptiveRateController':
+        """Creates a controller from the application configuration"""
+        return cls(idle_fps=config.idle_fps,
+                   active_fps=config.active_fps,
+                   active_hold=config.active_hold_seconds,
+                   temp_limit=config.thermal_limit_celsius,
+                   load_limit=config.cpu_load_limit,
+                   check_interval=config.thermal_check_interval,
+                   hardware_detector=hardware_detector)
+
+    def note_activity(self, now: Optional[float] = None):
+        """Switches to the active rate (motion or a detection was seen)"""
+        self._last_activity = time.monotonic() if now is None else now
+
+    def mark_frame(self, now: Optional[float] = None):
+        """Records that a frame is being processed"""
+        self._last_frame = time.monotonic() if now is None else now
+
+    def is_active(self, now: Optional[float] = None) -> bool:
+        """Returns True while activity was seen within active_hold seconds"""
+        now = time.monotonic() if now is None else now
+        return now - self._last_activity < self.active_hold
+
+    def _update_backoff(self, now: float):
+        """Reads temperature and CPU load and adjusts the backoff factor"""
+        if self.hardware_detector is None or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        self.temperature = self.hardware_detector.get_temperature()
+        self.cpu_load = self.hardware_detector.get_cpu_load()
+
+        too_hot = self.temperature is not None and self.temperature >= self.temp_limit
+        overloaded = self.cpu_load >= self.load_limit
+        cooled_down = ((self.temperature is None or self.temperature < self.temp_limit - 5)
+                       and self.cpu_load < self.load_limit * 0.8)
+
+        if (too_hot or overloaded) and self.backoff < self.max_backoff:
+            self.backoff *= 2
+            logger.info("Rate controller: backing off x%d (temperature %s, load %.2f)",
+                        self.backoff, self.temperature, self.cpu_load)
+        elif cooled_down and self.backoff > 1:
+            self.backoff //= 2
+            logger.info("Rate controller: backoff reduced to x%d", self.backoff)
+
+    def current_interval(self, now: Optional[float] = None) -> float:
+        """Returns the current minimum time between two processed frames"""
+        now = time.monotonic() if now is None else now
+        self._update_backoff(now)
+        interval = self.active_interval if self.is_active(now) else self.idle_interval
+        return interval * self.backoff
+
+    def time_until_due(self, now: Optional[float] = None) -> float:
+        """Returns how long to wait before the next frame should be processed"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._last_frame + self.current_interval(now) - now)
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        """Returns True if the next frame may be processed now"""
+        return self.time_until_due(now) <= 0
+
+    def get_stats(self) -> dict:
+        """Returns the current mode, rate and last hardware readings"""
+        interval = self.current_interval()
+        return {
+            'active': self.is_active(),
+            'target_fps': 1.0 / interval,
+            'backoff': self.backoff,
+            'temperature': self.temperature,
+            'cpu_load': self.cpu_load
+        }
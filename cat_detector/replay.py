@@ -0,0 +1,363 @@
+"""Offline replay and benchmark of the full detection pipeline
+
+Usage (from the repository root):
+    python -m cat_detector.replay garden.mp4 [--config config.txt] [--realtime]
+    python -m cat_detector.replay frames_dir/ --report report.json
+
+Drives a StreamProcessor from a video file or a directory of images instead
+of the RTSP stream. MQTT messages go to an in-memory fake and database rows
+to SQLite (in memory unless --sqlite is given), so neither a broker nor
+MariaDB is needed. Without --realtime, frames are fed as fast as the pipeline
+takes them (no drops); with it, frames arrive at the source frame rate and
+the newest-frame-wins grabber drops what the pipeline cannot keep up with.
+The JSON report contains throughput, per-stage latency percentiles, peak RSS
+and the detections found, for comparing models, backends and releases.
+"""
+
+import argparse
+import contextlib
+import json
+import resource
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+import cv2
+import sys
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.config import Config, default_config_path
+from cat_detector.database_handler import DatabaseHandler
+from cat_detector.frame_grabber import FrameGrabber
+from cat_detector.log_setup import configure_logging
+from cat_detector.startup import STARTUP
+from cat_detector.stream_processor import StreamProcessor
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS detections_images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    camera_name TEXT NOT NULL,
+    accuracy REAL,
+    blob_jpeg BLOB,
+    image_path TEXT,
+    image_size INTEGER,
+    image_sha256 TEXT,
+    thumbnail_jpeg BLOB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class ReplayGrabber(FrameGrabber):
+    """FrameGrabber that reads a video file or an image directory
+
+    In realtime mode the capture thread publishes frames at the source frame
+    rate, exactly like a live stream. Otherwise read() decodes the next frame
+    on demand, so every frame of the source is processed.
+    """
+
+    def __init__(self, source: str, realtime: bool = False,
+                 fps: Optional[float] = None, name: str = ''):
+        super().__init__(source, reconnect_delay=0, name=name)
+        self.realtime = realtime
+        self.fps = fps or self._source_fps(source)
+        self.decode_times = []
+        self._frames = self._iter_frames(source)
+
+    @staticmethod
+    def _source_fps(source: str) -> float:
+        """Returns the frame rate of a video file (10 for image directories)"""
+        if os.path.isdir(source):
+            return 10.0
+        cap = cv2.VideoCapture(source)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        return fps if fps and fps > 0 else 10.0
+
+    @staticmethod
+    def _iter_frames(source: str):
+        """Yields the frames of a video file or of the images in a directory"""
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    frame = cv2.imread(os.path.join(source, name))
+                    if frame is not None:
+                        yield frame
+            return
+
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video file: {source}")
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                yield frame
+        finally:
+            cap.release()
+
+    def _next_frame(self):
+        """Decodes the next frame, or marks the source as finished"""
+        start = time.perf_counter()
+        frame = next(self._frames, None)
+        if frame is None:
+            self.finished = True
+            return None
+        self.decode_times.append(time.perf_counter() - start)
+        return frame
+
+    def start(self):
+        """Starts the paced capture thread in realtime mode"""
+        if self.realtime:
+            super().start()
+
+    def _capture_loop(self):
+        """Publishes frames at the source frame rate until the source ends"""
+        self.connected = True
+        interval = 1.0 / self.fps
+        next_time = time.monotonic()
+        while self._running:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            self._publish_frame(frame)
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.connected = False
+
+    def read(self, timeout: float = 1.0):
+        """Returns the next frame (realtime: the newest published frame)"""
+        if self.realtime:
+            return super().read(timeout)
+        frame = self._next_frame()
+        if frame is not None:
+            with self._condition:
+                self.frames_captured += 1
+                self.frames_delivered += 1
+        return frame
+
+
+class FakeMQTTHandler:
+    """Records MQTT messages in memory instead of sending them"""
+
+    def __init__(self):
+        self.messages = []
+
+    def publish_detection(self, class_name: str, confidence: float,  # pylint: disable=too-many-arguments
+                          timestamp: str, topic: Optional[str] = None,
+                          event_id: Optional[int] = None):
+        """Records a detection message"""
+        self.messages.append({'topic': f'{topic}/{class_name}', 'time': timestamp,
+                              'confidence': confidence, 'event_id': event_id})
+
+    def publish_event_end(self, class_name: str, event_id: int,  # pylint: disable=too-many-arguments
+                          summary: dict, timestamp: str, topic: Optional[str] = None):
+        """Records the end of a visit event"""
+        self.messages.append({'topic': f'{topic}/{class_name}/end', 'time': timestamp,
+                              'event_id': event_id, **summary})
+
+    def get_stats(self) -> dict:
+        """Returns the number of recorded messages"""
+        return {'connected': True, 'messages_published': len(self.messages),
+                'messages_queued': 0, 'messages_dropped': 0, 'queue_depth': 0}
+
+    def close(self):
+        """Nothing to close"""
+
+
+class SqliteDatabaseHandler(DatabaseHandler):
+    """DatabaseHandler that writes rows to SQLite instead of MariaDB
+
+    Encoding, the image store and batching are the real implementations;
+    only the transaction goes to a local SQLite database.
+    """
+
+    def __init__(self, config: Config, path: str = ':memory:'):
+        super().__init__(config)
+        self._sqlite = sqlite3.connect(path, check_same_thread=False)
+        self._sqlite.execute(CREATE_TABLE_SQL)
+        self._sqlite_lock = threading.Lock()
+        self.rows_inserted = 0
+        self.insert_times = []
+
+    def get_connection(self):
+        """No MariaDB in replay mode"""
+        return None
+
+    def _insert_rows(self, rows) -> bool:
+        start = time.perf_counter()
+        with self._sqlite_lock:
+            self._sqlite.executemany(self.insert_sql.replace('%s', '?'), rows)
+            self._sqlite.commit()
+            self.rows_inserted += len(rows)
+        self.insert_times.append(time.perf_counter() - start)
+        return True
+
+
+def _percentiles(samples) -> dict:
+    """Returns count, mean and p50/p90/p99/max in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': round(percentile(0.50), 2),
+        'p90_ms': round(percentile(0.90), 2),
+        'p99_ms': round(percentile(0.99), 2),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+
+class ReplayBenchmark:  # pylint: disable=too-many-instance-attributes
+    """Runs a StreamProcessor over a recorded source and collects a report"""
+
+    def __init__(self, config: Config, source: str, realtime: bool = False,  # pylint: disable=too-many-arguments
+                 fps: Optional[float] = None, output_dir: Optional[str] = None,
+                 sqlite_path: str = ':memory:'):
+        self.config = config
+        self.source = source
+        self.realtime = realtime
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix='katzenschreck_replay_')
+        self.grabber = ReplayGrabber(source, realtime, fps, name=config.camera_name)
+        self.mqtt_handler = FakeMQTTHandler()
+        self.db_handler = SqliteDatabaseHandler(config, sqlite_path)
+        self.processor = StreamProcessor(config, self.output_dir,
+                                         mqtt_handler=self.mqtt_handler,
+                                         db_handler=self.db_handler,
+                                         frame_grabber=self.grabber)
+        self.stage_times = defaultdict(list)
+        self.detections = Counter()
+        self._instrument()
+
+    def _timed(self, stage: str, function):
+        """Wraps a callable so its duration is recorded under stage"""
+        samples = self.stage_times[stage]
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return wrapper
+
+    def _instrument(self):
+        """Times each pipeline stage on this processor instance only"""
+        processor = self.processor
+        detector = processor.detector
+        processor._resize_frame_to_fullhd = self._timed(  # pylint: disable=protected-access
+            'resize', processor._resize_frame_to_fullhd)  # pylint: disable=protected-access
+        processor.needs_inference = self._timed('motion_gate', processor.needs_inference)
+        processor.handle_detections = self._timed('postprocess', processor.handle_detections)
+        processor.persistence.handler = self._timed('persist', processor.persistence.handler)
+        for name in ('detect_objects', 'detect_batch', 'detect_regions'):
+            setattr(detector, name, self._timed('inference', getattr(detector, name)))
+
+        filter_detections = processor._filter_detections  # pylint: disable=protected-access
+
+        def count_accepted(frame, detections):
+            accepted = filter_detections(frame, detections)
+            for class_id, _, _ in accepted:
+                self.detections[detector.class_name(class_id)] += 1
+            return accepted
+        processor._filter_detections = count_accepted  # pylint: disable=protected-access
+
+    def run(self) -> dict:
+        """Replays the whole source and returns the report"""
+        start = time.perf_counter()
+        self.processor.run()
+        duration = time.perf_counter() - start
+
+        capture = self.grabber.get_stats()
+        processed = capture['frames_delivered']
+        stages = {'decode': _percentiles(self.grabber.decode_times)}
+        stages.update({stage: _percentiles(samples)
+                       for stage, samples in self.stage_times.items()})
+        stages['db_insert'] = _percentiles(self.db_handler.insert_times)
+
+        report = {
+            'source': self.source,
+            'mode': 'realtime' if self.realtime else 'max_speed',
+            'source_fps': round(self.grabber.fps, 2),
+            'model': self.processor.detector.model_path,
+            'backend': self.processor.detector.backend,
+            'imgsz': self.processor.detector.imgsz,
+            'duration_s': round(duration, 3),
+            'frames_captured': capture['frames_captured'],
+            'frames_processed': processed,
+            'frames_dropped': capture['frames_dropped'],
+            'fps': round(processed / duration, 2) if duration > 0 else 0.0,
+            'stages': stages,
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'detections': dict(self.detections),
+            'mqtt_messages': len(self.mqtt_handler.messages),
+            'db_rows': self.db_handler.rows_inserted,
+            'persistence': self.processor.persistence.get_stats(),
+            'startup_seconds': {name: round(seconds, 3)
+                                for name, seconds in STARTUP.stages.items()}
+        }
+        if self.processor.motion_gate:
+            report['motion_gate'] = self.processor.motion_gate.get_stats()
+        return report
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Replay a video file or image directory through the detection pipeline.")
+    parser.add_argument("source", type=str,
+                        help="Video file or directory of images (sorted by name).")
+    parser.add_argument("--config", type=str, default=default_config_path(),
+                        help="Path to config.txt (stream, MQTT and DB settings are not used).")
+    parser.add_argument("--realtime", action='store_true',
+                        help="Feed frames at the source frame rate instead of as fast as possible.")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="Source frame rate (default: from the video, 10 for directories).")
+    parser.add_argument("--output-dir", type=str, default=None,
+                        help="Folder for annotated detections (default: a temporary folder).")
+    parser.add_argument("--sqlite", type=str, default=':memory:',
+                        help="SQLite file for the database rows (default: in memory).")
+    parser.add_argument("--report", type=str, default=None,
+                        help="Write the JSON report to this file (default: stdout).")
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    # The report goes to stdout, log messages to stderr
+    configure_logging(config.log_level, config.log_format,
+                      config.log_rate_limit, config.log_rate_interval, stream=sys.stderr)
+    # Multi-camera configs replay with the settings of the first camera
+    config = config.get_camera_configs()[0]
+
+    # Anything third-party code prints while loading and running the model
+    # goes to stderr as well, so stdout holds nothing but the report
+    with contextlib.redirect_stdout(sys.stderr):
+        benchmark = ReplayBenchmark(config, args.source, args.realtime, args.fps,
+                                    args.output_dir, args.sqlite)
+        report = json.dumps(benchmark.run(), indent=2)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            file.write(report + '\n')
+        print(f"Report written to {args.report}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,144 @@
 """Results folder cleanup utility for disk space management"""
 
+import bisect
+import logging
 import os
 import shutil
+import threading
+
+
+logger = logging.getLogger(__name__)
 
 
 def cleanup_results_folder(results_folder, usage_threshold):
     """
-    Deletes the oldest images in results_folder when the root partition
-    usage exceeds usage_threshold (e.g. 0.8 for 80%).
+    Deletes the oldest images in results_folder when the usage of the partition
+    holding results_folder exceeds usage_threshold (e.g. 0.8 for 80%).
+
+    One-shot variant that scans the whole folder; the detection loop uses
+    RetentionManager instead.
     """
-    try:
-        total, used, _ = shutil.disk_usage("/")
-        usage = used / total
-        if usage < usage_threshold:
-            return  # Nothing to do
+    manager = RetentionManager(results_folder, usage_threshold)
+    manager.scan()
+    manager.enforce()
 
-        # Check if directory exists
-        if not os.path.exists(results_folder):
-            return  # Directory doesn't exist, nothing to delete
 
-        # All image files in results_folder (only .jpg)
-        try:
-            images = [os.path.join(results_folder, f)
-                     for f in os.listdir(results_folder)
-                     if f.lower().endswith('.jpg')]
-        except OSError:
-            return  # Error reading directory
+class RetentionManager:
+    """Keeps the results partition below usage_threshold with an incremental index
+
+    The index holds (mtime, path, size) of every saved image, oldest first. It
+    is built by one scan at startup and then extended by add() for each saved
+    file, so the folder is never listed again. enforce() computes how many
+    bytes have to go from a single disk_usage call and deletes the oldest
+    files until that amount is freed. It runs on a background timer.
+    """
+
+    def __init__(self, results_folder: str, usage_threshold: float,
+                 interval: float = 60.0):
+        self.results_folder = results_folder
+        self.usage_threshold = usage_threshold
+        self.interval = interval
+        self._index = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.files_deleted = 0
+        self.bytes_deleted = 0
 
-        if not images:
-            return  # No images present
+    def scan(self):
+        """Builds the index from the images already in results_folder"""
+        entries = []
+        for directory, _, files in os.walk(self.results_folder):
+            for name in files:
+                if not name.lower().endswith('.jpg'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Deleted in the meantime
+                entries.append((stat.st_mtime, path, stat.st_size))
+        with self._lock:
+            # Keep images added while the scan was running
+            scanned = {entry[1] for entry in entries}
+            entries.extend(entry for entry in self._index if entry[1] not in scanned)
+            entries.sort()
+            self._index = entries
 
-        # Sort by creation time (oldest first)
-        images.sort(key=os.path.getctime)
+    def add(self, path: str, size: int, mtime: float = None):
+        """Adds a newly saved image to the index"""
+        if mtime is None:
+            mtime = os.path.getmtime(path)
+        with self._lock:
+            # Appending is the common case; insort keeps the order otherwise
+            if not self._index or self._index[-1][0] <= mtime:
+                self._index.append((mtime, path, size))
+            else:
+                bisect.insort(self._index, (mtime, path, size))
 
-        # Delete until usage is below threshold or no images left
-        for img in images:
+    def bytes_to_free(self) -> int:
+        """Returns how many bytes must be deleted to get below the threshold"""
+        total, used, _ = shutil.disk_usage(self.results_folder)
+        return max(0, int(used - self.usage_threshold * total))
+
+    def enforce(self) -> int:
+        """Deletes the oldest images until enough space is free, returns freed bytes"""
+        try:
+            to_free = self.bytes_to_free()
+        except OSError as e:
+            logger.error("Error in results retention: %s", e)
+            return 0
+        if to_free <= 0:
+            return 0
+
+        # Pick the oldest images that add up to the required amount at once
+        with self._lock:
+            count = 0
+            selected_bytes = 0
+            while count < len(self._index) and selected_bytes < to_free:
+                selected_bytes += self._index[count][2]
+                count += 1
+            expired = self._index[:count]
+            del self._index[:count]
+
+        freed = 0
+        deleted = 0
+        for _, path, size in expired:
             try:
-                os.remove(img)
-                total, used, _ = shutil.disk_usage("/")
-                usage = used / total
-                if usage < usage_threshold:
-                    break
+                os.remove(path)
             except OSError:
-                continue  # Error deleting, skip this file
+                continue  # Already gone or error deleting, skip this file
+            freed += size
+            deleted += 1
+
+        self.files_deleted += deleted
+        self.bytes_deleted += freed
+        if deleted:
+            logger.info("Results retention: deleted %d images (%.1f MB)",
+                        deleted, freed / (1024 * 1024))
+        return freed
+
+    def start(self):
+        """Scans the folder and starts the background timer"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        """Builds the index, then enforces the threshold every interval"""
+        self.scan()
+        while True:
+            self.enforce()
+            if self._stop_event.wait(self.interval):
+                return
 
-    except (OSError, ValueError, PermissionError) as e:
-        print(f"Error in cleanup_results_folder: {e}")
-        return
+    def stop(self):
+        """Stops the background timer"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
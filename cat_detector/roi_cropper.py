@@ -0,0 +1,87 @@
+"""Region-of-interest cropping for full-resolution inference"""
+
+from typing import List, Optional, Tuple
+
+
+class RoiCropper:
+    """Computes full-resolution crops around motion regions or configured ROIs
+
+    YOLO letterboxes whatever it gets down to its input size, so a small cat at
+    the far end of the garden loses most of its pixels when the whole frame is
+    passed in. Cropping the native-resolution frame around the interesting
+    regions keeps those pixels. When the crops would cover most of the frame
+    anyway, None is returned and the caller falls back to full-frame inference.
+    """
+
+    def __init__(self, static_rois: Optional[List[List[float]]] = None,
+                 padding: float = 0.05, min_size: int = 640,
+                 max_coverage: float = 0.6):
+        self.static_rois = static_rois or []
+        self.padding = padding
+        self.min_size = min_size
+        self.max_coverage = max_coverage
+
+    def _to_pixels(self, region: List[float], frame_w: int,
+                   frame_h: int) -> List[int]:
+        """Converts a fractional region to a padded pixel box of at least min_size"""
+        x_min, y_min, x_max, y_max = region
+        x1 = (x_min - self.padding) * frame_w
+        y1 = (y_min - self.padding) * frame_h
+        x2 = (x_max + self.padding) * frame_w
+        y2 = (y_max + self.padding) * frame_h
+
+        # Grow small regions around their centre so YOLO gets enough context
+        for low, high, limit in ((0, 2, frame_w), (1, 3, frame_h)):
+            box = [x1, y1, x2, y2]
+            size = min(self.min_size, limit)
+            if box[high] - box[low] < size:
+                centre = (box[low] + box[high]) / 2
+                box[low] = centre - size / 2
+                box[high] = centre + size / 2
+            # Shift back inside the frame instead of shrinking
+            if box[low] < 0:
+                box[high] -= box[low]
+                box[low] = 0
+            if box[high] > limit:
+                box[low] -= box[high] - limit
+                box[high] = limit
+            x1, y1, x2, y2 = box
+
+        return [int(max(0, x1)), int(max(0, y1)), int(x2), int(y2)]
+
+    @staticmethod
+    def _merge(boxes: List[List[int]]) -> List[List[int]]:
+        """Merges overlapping boxes until no two boxes overlap"""
+        merged = [list(box) for box in boxes]
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(merged)):
+                for j in range(i + 1, len(merged)):
+                    a, b = merged[i], merged[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        merged[i] = [min(a[0], b[0]), min(a[1], b[1]),
+                                     max(a[2], b[2]), max(a[3], b[3])]
+                        del merged[j]
+                        changed = True
+                        break
+                if changed:
+                    break
+        return merged
+
+    def get_crops(self, frame_shape: Tuple[int, int],
+                  motion_regions: Optional[List[List[float]]] = None
+                  ) -> Optional[List[List[int]]]:
+        """Returns pixel crops [x1, y1, x2, y2], or None for full-frame inference"""
+        regions = list(motion_regions or []) + self.static_rois
+        if not regions:
+            return None
+
+        frame_h, frame_w = frame_shape[:2]
+        crops = self._merge([self._to_pixels(region, frame_w, frame_h)
+                             for region in regions])
+
+        covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in crops)
+        if covered > self.max_coverage * frame_w * frame_h:
+            return None
+        return crops
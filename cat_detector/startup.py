@@ -0,0 +1,92 @@
+"""Startup timing and concurrent initialisation of the slow components"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict
+import os
+
+# Add the parent directory to the Python path for absolute imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cat_detector.metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+STARTUP_SECONDS = REGISTRY.gauge('katzenschreck_startup_seconds',
+                                 'Duration of each startup stage (imports, model, connections)',
+                                 ('stage',))
+
+
+class StartupProfile:
+    """Records how long each startup stage took
+
+    Stages may run concurrently (see run_parallel), so their durations can
+    add up to more than the total. Every stage is logged when the report is
+    written and exported as katzenschreck_startup_seconds{stage=...}; stages
+    that finish later, like the first stream connection, still update the
+    gauge.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        """Stores the duration of a stage"""
+        with self._lock:
+            self.stages[name] = seconds
+        STARTUP_SECONDS.set(round(seconds, 3), stage=name)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Context manager that records the duration of its block as a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def import_module(self, name: str):
+        """Imports a (heavy) module on first use and records the import time"""
+        if name in sys.modules:
+            return sys.modules[name]
+        with self.stage(f'import {name}'):
+            return importlib.import_module(name)
+
+    def run_parallel(self, tasks: Dict[str, Callable[[], object]]) -> Dict[str, object]:
+        """Runs the tasks in threads, records each as a stage and returns their results
+
+        Waits for all tasks; the first exception is raised after that.
+        """
+        if not tasks:
+            return {}
+
+        def timed(name, task):
+            with self.stage(name):
+                return task()
+
+        with ThreadPoolExecutor(max_workers=len(tasks),
+                                thread_name_prefix='startup') as executor:
+            futures = {name: executor.submit(timed, name, task)
+                       for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def report(self):
+        """Logs all stages recorded so far and the time since process start"""
+        total = time.perf_counter() - self.started
+        self.record('total', total)
+        with self._lock:
+            stages = ', '.join(f'{name} {seconds:.2f} s'
+                               for name, seconds in self.stages.items() if name != 'total')
+        logger.info("Startup finished in %.2f s (%s)", total, stages)
+
+
+# One profile per process, started when this module is first imported
+STARTUP = StartupProfile()
@@ -1,29 +1,129 @@
 """Video stream processing for the cat deterrent system"""
 
+import logging
 import os
+import threading
 import time
 import cv2
+import numpy as np
 import sys
+from typing import Optional
 
 # Add the parent directory to the Python path for absolute imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cat_detector.config import Config
-from cat_detector.object_detector import ObjectDetector
+from cat_detector.object_detector import Detections, ObjectDetector
 from cat_detector.mqtt_handler import MQTTHandler
 from cat_detector.database_handler import DatabaseHandler
-from cat_detector.results_cleanup import cleanup_results_folder
+from cat_detector.capture_backends import CaptureBackend
+from cat_detector.frame_grabber import FrameGrabber
+from cat_detector.motion_gate import MotionGate
+from cat_detector.roi_cropper import RoiCropper
+from cat_detector.results_cleanup import RetentionManager
+from cat_detector.persistence_pipeline import DetectionEvent, PersistencePipeline
+from cat_detector.detection_tracker import DetectionTracker
+from cat_detector.hardware_detector import HardwareDetector
+from cat_detector.rate_controller import AdaptiveRateController
+from cat_detector.zone_mask import ZoneMask
+from cat_detector.metrics import REGISTRY, DETECTIONS_TOTAL, STAGE_SECONDS
+from cat_detector.log_setup import LogAggregator
+from cat_detector.startup import STARTUP
+
+
+logger = logging.getLogger(__name__)
 
 
 class StreamProcessor:  # pylint: disable=too-few-public-methods
     """Main class for video stream processing"""
 
-    def __init__(self, config: Config, output_dir: str):
+    def __init__(self, config: Config, output_dir: str,  # pylint: disable=too-many-arguments
+                 detector: Optional[ObjectDetector] = None,
+                 mqtt_handler: Optional[MQTTHandler] = None,
+                 db_handler: Optional[DatabaseHandler] = None,
+                 retention: Optional[RetentionManager] = None,
+                 frame_grabber: Optional[FrameGrabber] = None):
         self.config = config
         self.output_dir = output_dir
-        self.detector = ObjectDetector(hardware_type=config.hardware_type)
-        self.mqtt_handler = MQTTHandler(config)
-        self.db_handler = DatabaseHandler(config)
+        if frame_grabber is None:
+            # Connect to the stream while the model loads
+            frame_grabber = self.create_frame_grabber(config)
+            frame_grabber.start()
+        self.frame_grabber = frame_grabber
+
+        # In multi-camera mode all processors share one detector (and model),
+        # one MQTT connection and one DB pool; whatever is missing is set up
+        # concurrently
+        tasks = {}
+        if detector is None:
+            tasks['model'] = lambda: ObjectDetector.from_config(config).warm_up()
+        if mqtt_handler is None:
+            tasks['mqtt'] = lambda: MQTTHandler(config)
+        if db_handler is None:
+            tasks['database'] = lambda: DatabaseHandler(config).warm_up()
+        started = STARTUP.run_parallel(tasks)
+        self.detector = detector or started['model']
+        self.mqtt_handler = mqtt_handler or started['mqtt']
+        self.db_handler = db_handler or started['database']
+        # Per-class confidence thresholds by class ID
+        self.class_thresholds = {self.detector.resolve_class(name): threshold
+                                 for name, threshold in config.class_confidence.items()}
+
+        # Ignore/include zones, rasterised once per frame resolution
+        self.zone_mask = ZoneMask.from_config(config)
+        self.motion_gate = None
+        if config.motion_gate_enabled:
+            self.motion_gate = MotionGate(self.zone_mask,
+                                          threshold=config.motion_threshold,
+                                          min_area=config.motion_min_area,
+                                          force_interval=config.motion_force_interval)
+        self.roi_cropper = None
+        if config.roi_crop_enabled:
+            self.roi_cropper = RoiCropper(config.roi_zones,
+                                          padding=config.roi_padding,
+                                          min_size=config.roi_min_size)
+
+        # Low idle rate, full rate after activity, backoff when hot or overloaded
+        self.rate_controller = None
+        if config.adaptive_rate_enabled:
+            self.rate_controller = AdaptiveRateController.from_config(
+                config, HardwareDetector(forced_type=config.hardware_type))
+
+        # Visit tracking: one alert and one stored image per cat visit
+        self.tracker = None
+        if config.event_tracking_enabled:
+            self.tracker = DetectionTracker(iou_threshold=config.event_iou_threshold,
+                                            end_timeout=config.event_end_timeout,
+                                            store_interval=config.event_store_interval)
+
+        # Annotation, encoding, disk and DB writes run on background workers
+        self.persistence = PersistencePipeline(
+            self._persist_event,
+            workers=config.persistence_workers,
+            queue_size=config.persistence_queue_size,
+            drop_policy=config.persistence_drop_policy)
+        # One reusable annotation buffer per persistence worker
+        self._annotation_buffers = threading.local()
+
+        # Results folder retention runs on its own timer; in multi-camera mode
+        # one manager covers the folders of all cameras
+        self.retention = retention or RetentionManager(output_dir,
+                                                       config.usage_threshold,
+                                                       config.retention_interval)
+
+        # Camera name on every per-camera record, so rate limits apply per camera
+        self._log_extra = {'camera': config.camera_name}
+        # Per-frame resizing is logged as one summary per interval
+        self._resize_log = LogAggregator(
+            logger, f"Resized %d frames to Full HD ({config.camera_name}) in the last %.0f s",
+            config.log_aggregate_interval, logging.DEBUG, extra=self._log_extra)
+
+        # Set by the application to run profiling windows from this loop
+        self.profiler = None
+
+        # Capture statistics output
+        self.last_stats_time = time.time()
+        self.stats_interval = 300  # 300 seconds = 5 minutes
 
         # Frame timing for hourly saving
         self.last_frame_save_time = 0
@@ -33,14 +133,37 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-    def _save_detection(self, annotated_frame, timestamp: str):
-        """Saves the detected frame"""
-        cleanup_results_folder(self.output_dir, self.config.usage_threshold)
+        # Gauges refreshed from the grabber and queues on every metrics scrape
+        self._capture_fps = REGISTRY.gauge('katzenschreck_capture_fps',
+                                           'Frames captured per second', ('camera',))
+        self._frames_dropped = REGISTRY.gauge('katzenschreck_frames_dropped',
+                                              'Frames overwritten before inference',
+                                              ('camera',))
+        self._queue_depth = REGISTRY.gauge('katzenschreck_persistence_queue_depth',
+                                           'Detections waiting to be persisted',
+                                           ('camera',))
+        self._last_metrics = (time.monotonic(), 0)
+        REGISTRY.add_collector(self._collect_metrics)
+
+    @staticmethod
+    def create_frame_grabber(config: Config) -> FrameGrabber:
+        """Creates the frame grabber for a camera (substream if configured)"""
+        return FrameGrabber(config.rtsp_substream_url or config.rtsp_stream_url,
+                            name=config.camera_name,
+                            backend=CaptureBackend.from_config(config))
+
+    def _save_detection(self, jpeg_data: bytes, timestamp: str):
+        """Saves the encoded detection frame"""
         output_file = f'{self.output_dir}/frame_{timestamp}.jpg'
-        cv2.imwrite(output_file, annotated_frame)
+        with open(output_file, 'wb') as file:
+            file.write(jpeg_data)
+        self.retention.add(output_file, len(jpeg_data))
 
     def _resize_frame_to_fullhd(self, frame):
-        """Reduces frame resolution from 4K to Full HD (1920x1080)"""
+        """Reduces frame resolution from 4K to Full HD (1920x1080)
+
+        A no-op when the capture backend already scales during decoding.
+        """
         height, width = frame.shape[:2]
 
         # Target resolution: Full HD (1920x1080)
@@ -49,109 +172,380 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
 
         # Only resize if frame is larger than Full HD
         if width > target_width or height > target_height:
-            resized_frame = cv2.resize(frame, (target_width, target_height),
-                                     interpolation=cv2.INTER_AREA)
-            print(f"Frame resized from {width}x{height} to "
-                  f"{target_width}x{target_height}")
-            return resized_frame
+            self._resize_log.add()
+            return cv2.resize(frame, (target_width, target_height),
+                              interpolation=cv2.INTER_AREA)
         # Frame is already Full HD or smaller
         return frame
 
     def _save_frame_to_database_if_needed(self, frame):
-        """Saves the current frame to database if one hour has passed"""
+        """Queues the current frame for the database if one hour has passed"""
         current_time = time.time()
 
         if current_time - self.last_frame_save_time >= self.frame_save_interval:
             self.last_frame_save_time = current_time
-            success = self.db_handler.save_frame_to_database(frame)
-            if success:
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"Frame saved to database at {timestamp}")
-            return success
+            return self.persistence.submit(DetectionEvent(frame))
 
         return False
 
-    def _process_detections(self, frame, detections, results):
-        """Processes the detections"""
-        for class_id, confidence, bbox in detections:
-            if confidence > self.config.confidence_threshold:
-                # Check ignore zone
-                if self.detector.is_in_ignore_zone(bbox, frame.shape,
-                                                 self.config.ignore_zone):
-                    continue
-
-                # Annotate frame
-                annotated_frame = None
-                for result in results:
-                    annotated_frame = result.plot()
-                    break
-
-                if annotated_frame is None:
-                    continue
-
-                # Generate timestamp
-                timestamp = time.strftime('%Y-%m-%d_%H-%M-%S-%f')[:-3]
-
-                # Save frame
-                self._save_detection(annotated_frame, timestamp)
-
-                # Save detection image to database
-                success = self.db_handler.save_frame_to_database(
-                    annotated_frame, confidence)
-                if success:
-                    print(f"Detection image saved to database "
-                          f"(Confidence: {confidence:.2f})")
-                else:
-                    print("Error saving detection image to database")
-
-                # Output information
-                class_name = self.detector.CLASS_NAMES.get(class_id, "Unknown")
-                print(f'Detected class ID: {class_id}')
-                print(f'Detected class name: {class_name}')
-                print(f'Detected class confidence: {confidence}')
-
-                # Send MQTT message
+    def _persist_event(self, event: DetectionEvent):
+        """Persists a queued event (runs on a persistence worker)"""
+        if not event.detections:
+            # Hourly snapshot
+            success = self.db_handler.save_frame_to_database(
+                event.frame, camera_name=self.config.camera_name)
+            if success:
+                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+                logger.info("Frame saved to database at %s", timestamp, extra=self._log_extra)
+            return
+
+        camera = self.config.camera_name
+        # Annotate once, only the accepted detections, into the worker's buffer
+        with STAGE_SECONDS.time(camera=camera, stage='annotate'):
+            annotated_frame = self.detector.annotate_frame(
+                event.frame, event.detections, out=self._annotation_buffer(event.frame))
+
+        # Encode once, disk and database get the same bytes
+        with STAGE_SECONDS.time(camera=camera, stage='encode'):
+            encoded = self.db_handler.encoder.encode(annotated_frame)
+
+        # Save frame
+        with STAGE_SECONDS.time(camera=camera, stage='disk'):
+            self._save_detection(encoded.jpeg, event.timestamp)
+
+        # Save detection image to database
+        with STAGE_SECONDS.time(camera=camera, stage='database'):
+            success = self.db_handler.save_encoded_to_database(
+                encoded, event.confidence, camera_name=camera)
+        if success:
+            logger.info("Detection image saved to database (Confidence: %.2f)",
+                        event.confidence, extra=self._log_extra)
+        else:
+            logger.error("Error saving detection image to database")
+
+    def _annotation_buffer(self, frame):
+        """Returns this worker's annotation buffer, reallocated if the frame size changed"""
+        buffer = getattr(self._annotation_buffers, 'frame', None)
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = np.empty_like(frame)
+            self._annotation_buffers.frame = buffer
+        return buffer
+
+    def _filter_detections(self, frame, detections: Detections):
+        """Returns the detections above threshold and outside the excluded zones
+
+        Both masks work on the detector's arrays; tuples are only built for
+        the detections that pass.
+        """
+        if not detections:
+            return []
+        thresholds = np.full(len(detections), self.config.confidence_threshold)
+        for class_id, threshold in self.class_thresholds.items():
+            thresholds[detections.class_ids == class_id] = threshold
+        keep = detections.confidences > thresholds
+        if self.zone_mask is not None and keep.any():
+            keep &= self.zone_mask.allowed(detections.boxes, frame.shape)
+        return detections.select(keep)
+
+    def _process_detections(self, frame, detections):
+        """Processes the detections, returns the accepted ones"""
+        accepted = self._filter_detections(frame, detections)
+        for class_id, _, _ in accepted:
+            DETECTIONS_TOTAL.inc(camera=self.config.camera_name,
+                                 class_name=self.detector.class_name(class_id))
+
+        if self.tracker is not None:
+            self._track_detections(frame, accepted)
+            return accepted
+        if not accepted:
+            return accepted
+
+        # Generate timestamp
+        timestamp = time.strftime('%Y-%m-%d_%H-%M-%S-%f')[:-3]
+        for class_id, confidence, _ in accepted:
+            # Output information
+            class_name = self.detector.class_name(class_id)
+            logger.info("Detected %s (class %d) with confidence %.2f",
+                        class_name, class_id, confidence, extra=self._log_extra)
+
+            # Send MQTT message first, persisting happens in the background
+            with STAGE_SECONDS.time(camera=self.config.camera_name, stage='mqtt'):
                 self.mqtt_handler.publish_detection(class_name, confidence,
-                                                   timestamp)
+                                                   timestamp,
+                                                   topic=self.config.mqtt_topic)
+
+        # One stored image per frame, annotated with all accepted detections
+        best_confidence = max(confidence for _, confidence, _ in accepted)
+        self.persistence.submit(DetectionEvent(frame, accepted,
+                                               best_confidence, timestamp))
+        return accepted
+
+    def _track_detections(self, frame, accepted):
+        """Groups detections into visit events: one alert at start, best frame stored"""
+        timestamp = time.strftime('%Y-%m-%d_%H-%M-%S-%f')[:-3]
+        started = self.tracker.update(accepted, frame, timestamp)
+
+        for event in started:
+            class_name = self.detector.class_name(event.class_id)
+            logger.info("Visit %d started: %s (confidence %.2f)",
+                        event.event_id, class_name, event.max_confidence,
+                        extra=self._log_extra)
+            with STAGE_SECONDS.time(camera=self.config.camera_name, stage='mqtt'):
+                self.mqtt_handler.publish_detection(class_name, event.max_confidence,
+                                                   timestamp,
+                                                   topic=self.config.mqtt_topic,
+                                                   event_id=event.event_id)
+
+        for event in self.tracker.collect_due():
+            self._store_event_frame(event)
+
+    def _store_event_frame(self, event):
+        """Queues the best pending frame of a visit event for persistence"""
+        best = event.take_best()
+        if best is None:
+            return
+        confidence, frame, detections, timestamp = best
+        self.persistence.submit(DetectionEvent(frame, detections,
+                                               confidence, timestamp))
+
+    def _close_ended_events(self):
+        """Stores and announces the visit events that have ended"""
+        if self.tracker is None:
+            return
+
+        for event in self.tracker.collect_ended():
+            self._end_event(event)
+
+    def _end_event(self, event):
+        """Stores the best frame of a visit and publishes its end message"""
+        class_name = self.detector.class_name(event.class_id)
+        duration = event.last_seen - event.start_time
+        logger.info("Visit %d ended: %s, %.0f s, %d detections, max confidence %.2f",
+                    event.event_id, class_name, duration, event.hits,
+                    event.max_confidence, extra=self._log_extra)
+        self._store_event_frame(event)
+        self.mqtt_handler.publish_event_end(
+            class_name, event.event_id,
+            {"duration": round(duration, 1),
+             "detections": event.hits,
+             "max_confidence": event.max_confidence},
+            time.strftime('%Y-%m-%d_%H-%M-%S'),
+            topic=self.config.mqtt_topic)
+
+    def _collect_metrics(self):
+        """Updates the per-camera gauges before a metrics scrape"""
+        stats = self.frame_grabber.get_stats()
+        now = time.monotonic()
+        last_time, last_captured = self._last_metrics
+        if now > last_time:
+            self._capture_fps.set(
+                round((stats['frames_captured'] - last_captured) / (now - last_time), 2),
+                camera=self.config.camera_name)
+        self._last_metrics = (now, stats['frames_captured'])
+        self._frames_dropped.set(stats['frames_dropped'], camera=self.config.camera_name)
+        self._queue_depth.set(self.persistence.get_stats()['queue_depth'],
+                              camera=self.config.camera_name)
+
+    def print_capture_stats_if_needed(self):
+        """Logs frame grabber counters every stats interval"""
+        current_time = time.time()
+        if current_time - self.last_stats_time < self.stats_interval:
+            return
+
+        self.last_stats_time = current_time
+        stats = self.frame_grabber.get_stats()
+        logger.info("Capture stats (%s): %d captured, %d processed, %d dropped, "
+                    "latency avg %.0f ms / max %.0f ms",
+                    self.config.camera_name, stats['frames_captured'],
+                    stats['frames_delivered'], stats['frames_dropped'],
+                    stats['avg_latency_ms'], stats['max_latency_ms'],
+                    extra=self._log_extra)
+
+        persistence_stats = self.persistence.get_stats()
+        logger.info("Persistence queue (%s): depth %d (max %d), %d processed, "
+                    "%d dropped, %d failed",
+                    self.config.camera_name, persistence_stats['queue_depth'],
+                    persistence_stats['max_queue_depth'],
+                    persistence_stats['events_processed'],
+                    persistence_stats['events_dropped'],
+                    persistence_stats['events_failed'], extra=self._log_extra)
+
+        if self.rate_controller:
+            rate_stats = self.rate_controller.get_stats()
+            logger.info("Rate controller (%s): %s, %.2f FPS target, backoff x%d, "
+                        "temperature %s, load %.2f",
+                        self.config.camera_name,
+                        'active' if rate_stats['active'] else 'idle',
+                        rate_stats['target_fps'], rate_stats['backoff'],
+                        rate_stats['temperature'], rate_stats['cpu_load'],
+                        extra=self._log_extra)
+
+        if self.motion_gate:
+            gate_stats = self.motion_gate.get_stats()
+            logger.info("Motion gate (%s): %d/%d frames skipped (%.1f%%), "
+                        "%d forced inferences, %d missed detections",
+                        self.config.camera_name, gate_stats['frames_skipped'],
+                        gate_stats['frames_checked'], gate_stats['skip_ratio'] * 100,
+                        gate_stats['forced_inferences'],
+                        gate_stats['missed_detections'], extra=self._log_extra)
+
+    def prepare_frame(self, frame):
+        """Prepares a captured frame for inference and stores the hourly snapshot"""
+        # Visits also end while the motion gate skips inference
+        self._close_ended_events()
+        if self.rate_controller:
+            self.rate_controller.mark_frame()
+
+        # Reduce frame resolution from 4K to Full HD
+        with STAGE_SECONDS.time(camera=self.config.camera_name, stage='resize'):
+            frame = self._resize_frame_to_fullhd(frame)
+
+        # Save frame to database every hour
+        self._save_frame_to_database_if_needed(frame)
+        return frame
+
+    def frame_due(self) -> bool:
+        """Returns True if the rate controller (if enabled) allows the next frame"""
+        return self.rate_controller is None or self.rate_controller.is_due()
+
+    def needs_inference(self, frame) -> bool:
+        """Checks the motion gate (if enabled) before running the detector"""
+        if self.motion_gate is None:
+            return True
+        with STAGE_SECONDS.time(camera=self.config.camera_name, stage='motion'):
+            infer = self.motion_gate.should_infer(frame)
+        if self.rate_controller and self.motion_gate.last_regions:
+            self.rate_controller.note_activity()
+        return infer
+
+    def handle_detections(self, frame, detections):
+        """Handles the detector output for a prepared frame"""
+        if detections and self.rate_controller:
+            self.rate_controller.note_activity()
+        accepted = []
+        try:
+            if detections:
+                with STAGE_SECONDS.time(camera=self.config.camera_name, stage='postprocess'):
+                    accepted = self._process_detections(frame, detections)
+        finally:
+            # Only detections that pass thresholds and zones count as missed,
+            # and every inferred frame is recorded so the gate stays in step
+            if self.motion_gate:
+                self.motion_gate.record_result(accepted)
+
+    def _detect_in_regions(self, full_frame, frame):
+        """Runs YOLO on full-resolution crops, returns None if the full frame is needed"""
+        motion_regions = self.motion_gate.last_regions if self.motion_gate else None
+        crops = self.roi_cropper.get_crops(full_frame.shape, motion_regions)
+        if crops is None:
+            return None
+
+        # Map boxes from native resolution to the prepared frame
+        scale_x = frame.shape[1] / full_frame.shape[1]
+        scale_y = frame.shape[0] / full_frame.shape[0]
+        detections = self.detector.detect_regions(full_frame, crops)
+        return detections.transformed(scale=(scale_x, scale_y)), None
+
+    def run_inference(self, full_frame, frame):
+        """Runs the detector on ROI crops (if enabled) or on the prepared frame"""
+        if self.roi_cropper:
+            output = self._detect_in_regions(full_frame, frame)
+            if output is not None:
+                return output
+        return self.detector.detect_objects(frame)
+
+    def process_frame(self, frame):
+        """Runs the detection pipeline on a single frame"""
+        full_frame = frame
+        frame = self.prepare_frame(full_frame)
+        if not self.needs_inference(frame):
+            return
+
+        # Object detection
+        with STAGE_SECONDS.time(camera=self.config.camera_name, stage='inference'):
+            detections, _ = self.run_inference(full_frame, frame)
+        self.handle_detections(frame, detections)
+
+    def process_batch(self, frames):
+        """Runs the detection pipeline on several frames in one batched forward pass"""
+        if self.roi_cropper:
+            # Crops of each frame are batched by detect_regions instead
+            for frame in frames:
+                self.process_frame(frame)
+            return
+
+        frames = [self.prepare_frame(frame) for frame in frames]
+        frames = [frame for frame in frames if self.needs_inference(frame)]
+        if not frames:
+            return
+        with STAGE_SECONDS.time(camera=self.config.camera_name, stage='inference'):
+            outputs = self.detector.detect_batch(frames)
+        for frame, (detections, _) in zip(frames, outputs):
+            self.handle_detections(frame, detections)
+
+    def _collect_frames(self):
+        """Collects up to inference_batch_size consecutive frames within the batch wait time"""
+        frame = self.frame_grabber.read(timeout=1.0)
+        if frame is None:
+            return []
+
+        frames = [frame]
+        deadline = time.monotonic() + self.config.inference_batch_wait_ms / 1000
+        while len(frames) < self.config.inference_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            frame = self.frame_grabber.read(timeout=remaining)
+            if frame is None:
+                break
+            frames.append(frame)
+        return frames
+
+    def stop(self):
+        """Stops capturing and waits for queued detections to be persisted"""
+        self.frame_grabber.stop()
+        REGISTRY.remove_collector(self._collect_metrics)
+        if self.tracker is not None:
+            # Visits still in progress end now (the MQTT client is closed later)
+            for event in self.tracker.active_events:
+                self._end_event(event)
+            self.tracker.active_events = []
+        self.persistence.stop()
+        self.db_handler.flush()
+        self.retention.stop()
 
     def run(self):
         """Main loop for stream processing"""
-        while True:
-            cap = cv2.VideoCapture(self.config.rtsp_stream_url)
-
-            if not cap.isOpened():
-                print(f"Error opening RTSP stream: "
-                      f"{self.config.rtsp_stream_url}. Retrying in 5 seconds...")
-                time.sleep(5)
-                continue
-
-            print("RTSP stream connection established successfully.")
-
-            # Process frames
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                # Reduce frame resolution from 4K to Full HD
-                frame = self._resize_frame_to_fullhd(frame)
-
-                # Save frame to database every hour
-                self._save_frame_to_database_if_needed(frame)
-
-                # Object detection
-                detections, results = self.detector.detect_objects(frame)
+        self.retention.start()
+        self.frame_grabber.start()
+
+        try:
+            while True:
+                if self.rate_controller:
+                    # The grabber keeps draining the stream while we wait
+                    delay = self.rate_controller.time_until_due()
+                    if delay > 0:
+                        time.sleep(min(delay, 1.0))
+                        continue
+
+                # Always get the newest frame(s), older ones are dropped by the grabber
+                with STAGE_SECONDS.time(camera=self.config.camera_name, stage='capture'):
+                    frames = self._collect_frames()
+                if not frames and self.frame_grabber.finished:
+                    return
+                if len(frames) == 1:
+                    self.process_frame(frames[0])
+                elif frames:
+                    self.process_batch(frames)
 
-                # Process detections
-                if detections:
-                    self._process_detections(frame, detections, results)
+                self.print_capture_stats_if_needed()
+                if self.profiler:
+                    self.profiler.tick()
 
                 # Exit on 'q'
                 if cv2.waitKey(1) & 0xFF == ord('q'):
-                    cap.release()
                     return
-
-            cap.release()
-
-        print(f'Frames with detected objects are saved in folder '
-              f'"{self.output_dir}".')
+        finally:
+            self.stop()
+            logger.info('Frames with detected objects are saved in folder "%s".',
+                        self.output_dir)
@@ -0,0 +1,105 @@
+"""Rasterised ignore/include zones for vectorised box filtering"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+
+
+Polygon = List[Tuple[float, float]]
+
+
+def rectangle_to_polygon(zone: Sequence[float]) -> Polygon:
+    """Converts x_min,y_min,x_max,y_max to a four-point polygon"""
+    x_min, y_min, x_max, y_max = zone
+    return [(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)]
+
+
+class ZoneMask:
+    """Ignore and include zones as a per-resolution excluded-pixel mask
+
+    Zones are polygons in fractional coordinates (0.0-1.0). A pixel is
+    excluded when it lies inside an ignore zone or, if include zones are
+    given, outside all of them. The mask and its integral image are built
+    once per frame resolution; afterwards the excluded area of any number of
+    boxes is four lookups each, independent of the number of zones. A box is
+    rejected when more than overlap_threshold of its area is excluded
+    (0.0 = any overlap, like the original rectangular ignore_zone).
+    """
+
+    def __init__(self, ignore_zones: Optional[List[Polygon]] = None,
+                 include_zones: Optional[List[Polygon]] = None,
+                 overlap_threshold: float = 0.0):
+        self.ignore_zones = ignore_zones or []
+        self.include_zones = include_zones or []
+        self.overlap_threshold = overlap_threshold
+        self._masks: Dict[Tuple[int, int], np.ndarray] = {}
+        self._integrals: Dict[Tuple[int, int], np.ndarray] = {}
+        self._allowed_masks: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ZoneMask']:
+        """Creates the zone mask of a camera, or None if no zone is configured"""
+        ignore_zones = list(config.ignore_zones)
+        if config.ignore_zone:
+            ignore_zones.append(rectangle_to_polygon(config.ignore_zone))
+        if not ignore_zones and not config.include_zones:
+            return None
+        return cls(ignore_zones, config.include_zones, config.zone_overlap_threshold)
+
+    @staticmethod
+    def _to_pixels(polygon: Polygon, width: int, height: int) -> np.ndarray:
+        """Scales a fractional polygon to pixel coordinates for fillPoly"""
+        points = np.array(polygon, dtype=np.float64) * (width, height)
+        return np.round(points).astype(np.int32)
+
+    def excluded_mask(self, shape) -> np.ndarray:
+        """Returns the 0/1 mask of excluded pixels for a frame shape"""
+        height, width = shape[:2]
+        mask = self._masks.get((height, width))
+        if mask is not None:
+            return mask
+
+        if self.include_zones:
+            mask = np.ones((height, width), dtype=np.uint8)
+            cv2.fillPoly(mask, [self._to_pixels(zone, width, height)
+                                for zone in self.include_zones], 0)
+        else:
+            mask = np.zeros((height, width), dtype=np.uint8)
+        if self.ignore_zones:
+            cv2.fillPoly(mask, [self._to_pixels(zone, width, height)
+                                for zone in self.ignore_zones], 1)
+
+        self._masks[(height, width)] = mask
+        self._integrals[(height, width)] = cv2.integral(mask)
+        return mask
+
+    def allowed_mask(self, shape) -> np.ndarray:
+        """Returns a 255/0 mask of the pixels outside the excluded area"""
+        height, width = shape[:2]
+        allowed = self._allowed_masks.get((height, width))
+        if allowed is None:
+            allowed = np.where(self.excluded_mask(shape) > 0, 0, 255).astype(np.uint8)
+            self._allowed_masks[(height, width)] = allowed
+        return allowed
+
+    def excluded_fraction(self, boxes: np.ndarray, shape) -> np.ndarray:
+        """Returns the excluded fraction of each xyxy pixel box (N x 4 array)"""
+        height, width = shape[:2]
+        self.excluded_mask(shape)
+        integral = self._integrals[(height, width)]
+
+        x1 = np.clip(np.floor(boxes[:, 0]), 0, width).astype(np.intp)
+        y1 = np.clip(np.floor(boxes[:, 1]), 0, height).astype(np.intp)
+        x2 = np.clip(np.ceil(boxes[:, 2]), 0, width).astype(np.intp)
+        y2 = np.clip(np.ceil(boxes[:, 3]), 0, height).astype(np.intp)
+
+        excluded = (integral[y2, x2] - integral[y1, x2]
+                    - integral[y2, x1] + integral[y1, x1])
+        area = np.maximum((x2 - x1) * (y2 - y1), 1)
+        return excluded / area
+
+    def allowed(self, boxes: np.ndarray, shape) -> np.ndarray:
+        """Returns a boolean array: True for boxes that pass the zones"""
+        if len(boxes) == 0:
+            return np.zeros(0, dtype=bool)
+        return self.excluded_fraction(boxes, shape) <= self.overlap_threshold
@@ -15,16 +15,30 @@ CREATE TABLE IF NOT EXISTS detections_images (
     id INT AUTO_INCREMENT PRIMARY KEY,
     camera_name VARCHAR(100) NOT NULL,
     accuracy DECIMAL(5, 4) DEFAULT 1.0000,
-    blob_jpeg LONGBLOB NOT NULL,
+    blob_jpeg LONGBLOB NULL,
+    image_path VARCHAR(255) NULL,
+    image_size INT UNSIGNED NULL,
+    image_sha256 CHAR(64) NULL,
     thumbnail_jpeg BLOB,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_camera_created (camera_name, created_at),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_image_sha256 (image_sha256)
 );
 
+-- Migration for existing installations (image store, see image_store_dir in config.txt):
+-- full-size JPEGs may live on disk, the row then only keeps path, size and hash.
+-- Afterwards move existing blobs with: python -m cat_detector.migrate_images
+ALTER TABLE detections_images
+    MODIFY blob_jpeg LONGBLOB NULL,
+    ADD COLUMN IF NOT EXISTS image_path VARCHAR(255) NULL AFTER blob_jpeg,
+    ADD COLUMN IF NOT EXISTS image_size INT UNSIGNED NULL AFTER image_path,
+    ADD COLUMN IF NOT EXISTS image_sha256 CHAR(64) NULL AFTER image_size,
+    ADD INDEX IF NOT EXISTS idx_image_sha256 (image_sha256);
+
 -- Example query for testing
 -- SELECT id, camera_name, accuracy, 
---        LENGTH(blob_jpeg) as image_size_bytes, 
+--        COALESCE(image_size, LENGTH(blob_jpeg)) as image_size_bytes, image_path,
 --        LENGTH(thumbnail_jpeg) as thumbnail_size_bytes, 
 --        created_at 
 -- FROM detections_images 